@@ -0,0 +1,48 @@
+"""Compare two benchmark reports written by ``benchmarks.run``.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def _ratio(new, old):
+    if not old or new is None:
+        return "      n/a"
+    return f"{new / old:>8.2f}x"
+
+
+def compare(before: dict, after: dict):
+    rows = []
+    for name, new in after["stages"].items():
+        old = before["stages"].get(name)
+        if old is None:
+            continue
+        rows.append((
+            name,
+            _ratio(new["throughput"], old["throughput"]),
+            _ratio(new["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+            _ratio(new["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+            f"{new['peak_rss_mb'] - old['peak_rss_mb']:>+9.1f}",
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{'stage':<10} {'throughput':>10} {'p50':>9} {'p99':>9} {'peak MB':>9}")
+    for row in compare(before, after):
+        print(f"{row[0]:<10} {row[1]:>10} {row[2]:>9} {row[3]:>9} {row[4]:>9}")
+
+
+if __name__ == "__main__":
+    main()
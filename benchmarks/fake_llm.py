@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+
+from langchain_core.language_models.llms import LLM
+
+DEFAULT_TRIPLES = [
+    {"head": "Students", "head_type": "Person", "relation": "USE", "tail": "LMS", "tail_type": "System"},
+    {"head": "Professors", "head_type": "Person", "relation": "GRADE", "tail": "Assignments", "tail_type": "Task"},
+    {"head": "LMS", "head_type": "System", "relation": "INTEGRATES", "tail": "AI", "tail_type": "Technology"},
+    {"head": "Teaching Assistants", "head_type": "Person", "relation": "HELP_WITH", "tail": "Grading", "tail_type": "Task"},
+    {"head": "Engagement Hub", "head_type": "Feature", "relation": "PART_OF", "tail": "LMS", "tail_type": "System"},
+    {"head": "Gradescope", "head_type": "System", "relation": "SUPPORTS", "tail": "Grading", "tail_type": "Task"},
+]
+
+
+class FakeGraphLLM(LLM):
+    """Offline stand-in for the Ollama LLM behind ``LLMGraphTransformer``.
+
+    Answers every prompt with canned graph JSON in the format the
+    transformer's prompt-based parser expects, after ``latency`` seconds
+    (plus up to ``jitter``). A ``failure_rate`` share of calls raise, so
+    timeouts and retries can be exercised without a server. With
+    ``entities`` set, triples are drawn from that many synthetic entities
+    instead of ``triples``, which gives benchmark-sized graphs.
+    """
+
+    triples: list = DEFAULT_TRIPLES
+    triples_per_call: int = 3
+    entities: int = 0
+    relation_types: int = 12
+    latency: float = 0.05
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-graph"
+
+    def _response(self, prompt: str) -> str:
+        # the same prompt always gets the same triples
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        if self.entities:
+            rng = random.Random(digest)
+            picked = []
+            for _ in range(self.triples_per_call):
+                head, tail = rng.sample(range(self.entities), 2)
+                picked.append({
+                    "head": f"Entity {head}",
+                    "head_type": f"Type{head % 7}",
+                    "relation": f"REL_{rng.randrange(self.relation_types)}",
+                    "tail": f"Entity {tail}",
+                    "tail_type": f"Type{tail % 7}",
+                })
+            return json.dumps(picked)
+        start = int.from_bytes(digest[:4], "little") % len(self.triples)
+        picked = [
+            self.triples[(start + k) % len(self.triples)]
+            for k in range(min(self.triples_per_call, len(self.triples)))
+        ]
+        return json.dumps(picked)
+
+    def _draw(self):
+        # seeded per call so a run with failures is reproducible
+        rng = random.Random(self.seed * 1_000_003 + self.calls)
+        self.calls += 1
+        return self.latency + rng.uniform(0, self.jitter), rng.random() < self.failure_rate
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs) -> str:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("simulated LLM failure")
+        return self._response(prompt)
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs) -> str:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("simulated LLM failure")
+        return self._response(prompt)
+
+
+_QUERY_TEMPLATES = [
+    "How does {a} relate to {b}?",
+    "What is the role of {a} in {b}?",
+    "Why would {a} need {b} and {c}?",
+    "Can you explain how {a} affects {b}?",
+    "Where do I find {a} when working on {b}?",
+    "What changed about {a}, {b} and {c} this year?",
+    "Who is responsible for {a}?",
+    "Is {a} required before {b}?",
+]
+_WORD = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+
+
+class FakeQueryLLM(FakeGraphLLM):
+    """``FakeGraphLLM`` that answers query-generation prompts with a JSON list of questions.
+
+    Questions mix a few templates with words drawn from the prompt, so
+    near-duplicate filtering sees about as much variety as with a real model.
+    """
+
+    queries_per_call: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-queries"
+
+    def _response(self, prompt: str) -> str:
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        words = sorted(set(_WORD.findall(prompt))) or ["this"]
+        return json.dumps([
+            rng.choice(_QUERY_TEMPLATES).format(
+                a=rng.choice(words), b=rng.choice(words), c=rng.choice(words)
+            )
+            for _ in range(self.queries_per_call)
+        ])
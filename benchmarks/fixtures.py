@@ -0,0 +1,128 @@
+"""Offline stand-ins for the pipeline's inputs and models.
+
+Everything here is generated from a seed, so two benchmark runs with the
+same arguments see the same documents, weights and LLM answers.
+"""
+import os
+import random
+
+_SYLLABLES = [
+    "ba", "co", "de", "fi", "ga", "hu", "ji", "ka", "lo", "me", "nu", "pa",
+    "qui", "ro", "sa", "te", "vi", "wo", "xa", "ze", "tion", "ment", "al", "er",
+]
+
+
+def _vocabulary(rng, size=2000):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def _paragraph(rng, words, sentences):
+    out = []
+    for _ in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 18)))
+        out.append(sentence[0].upper() + sentence[1:] + ".")
+    return " ".join(out)
+
+
+def synthetic_paragraphs(n, seed=0, duplicate_rate=0.1):
+    """``n`` body-text paragraphs, with a share of them repeating earlier ones."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    paragraphs = []
+    for _ in range(n):
+        if paragraphs and rng.random() < duplicate_rate:
+            paragraphs.append(rng.choice(paragraphs))
+        else:
+            paragraphs.append(_paragraph(rng, words, rng.randint(3, 6)))
+    return paragraphs
+
+
+def make_pdf(path, pages=300, seed=0, paragraphs_per_page=4, duplicate_rate=0.1):
+    """Write a report-like PDF: a large heading and body paragraphs on every page."""
+    import fitz
+
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+    body = synthetic_paragraphs(pages * paragraphs_per_page, seed, duplicate_rate)
+
+    doc = fitz.open()
+    for pno in range(pages):
+        page = doc.new_page()
+        width, height = page.rect.width, page.rect.height
+        heading = " ".join(rng.choice(words) for _ in range(4)).title()
+        page.insert_textbox(fitz.Rect(50, 40, width - 50, 80), f"{pno + 1}. {heading}", fontsize=16)
+        y = 90
+        for text in body[pno * paragraphs_per_page:(pno + 1) * paragraphs_per_page]:
+            box = fitz.Rect(50, y, width - 50, height - 40)
+            # insert_textbox returns the unused height of the box
+            left = page.insert_textbox(box, text, fontsize=10)
+            if left < 0:
+                break
+            y = box.y1 - left + 14
+        page.insert_textbox(fitz.Rect(50, height - 30, width - 50, height - 10), f"Page {pno + 1}", fontsize=8)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def tiny_pegasus(workdir, seed=0, vocab_size=2000, d_model=64, layers=2):
+    """A randomly initialized Pegasus with a SentencePiece vocab trained on synthetic text.
+
+    Stands in for ``google/pegasus-cnn_dailymail`` without any download; the
+    summaries are noise, but the shapes of tokenization, padding and beam
+    search are the real ones.
+    """
+    import sentencepiece as spm
+    import torch
+    from transformers import PegasusConfig, PegasusForConditionalGeneration, PegasusTokenizer
+
+    prefix = os.path.join(workdir, f"tiny_pegasus_{seed}_{vocab_size}")
+    if not os.path.exists(f"{prefix}.model"):
+        corpus = f"{prefix}.txt"
+        with open(corpus, "w") as f:
+            f.write("\n".join(synthetic_paragraphs(2000, seed, duplicate_rate=0)))
+        spm.SentencePieceTrainer.train(
+            input=corpus,
+            model_prefix=prefix,
+            vocab_size=vocab_size,
+            # Pegasus's own layout: pad 0, eos 1, unk 2, no bos
+            pad_id=0,
+            eos_id=1,
+            unk_id=2,
+            bos_id=-1,
+            num_threads=1,
+            minloglevel=2,
+        )
+
+    tokenizer = PegasusTokenizer(vocab_file=f"{prefix}.model", model_max_length=1024)
+    torch.manual_seed(seed)
+    config = PegasusConfig(
+        vocab_size=len(tokenizer),
+        d_model=d_model,
+        encoder_layers=layers,
+        decoder_layers=layers,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=d_model * 2,
+        decoder_ffn_dim=d_model * 2,
+        max_position_embeddings=1024,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+    )
+    # shows up in result-cache keys in place of the hub model name
+    config.name_or_path = f"tiny-pegasus-{seed}"
+    return tokenizer, PegasusForConditionalGeneration(config).eval()
+
+
+def fake_graph_transformer(latency=0.05, jitter=0.02, entities=5000, seed=0):
+    """The real ``LLMGraphTransformer`` driven by ``FakeGraphLLM``."""
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+    from benchmarks.fake_llm import FakeGraphLLM
+
+    llm = FakeGraphLLM(latency=latency, jitter=jitter, entities=entities, seed=seed)
+    return LLMGraphTransformer(llm=llm)
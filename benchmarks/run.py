@@ -0,0 +1,327 @@
+"""Offline benchmark of every pipeline stage.
+
+    python -m benchmarks.run --pages 300 --out bench.json
+    python -m benchmarks.compare before.json bench.json
+
+Needs no network: the PDF is synthetic, Pegasus is a tiny random model with
+a locally trained vocabulary and the LLM is ``FakeGraphLLM``. Each stage
+reports throughput, per-call latency percentiles and peak RSS.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import psutil
+
+STAGES = (
+    "extract", "dedup", "summarize", "reduce", "chunk",
+    "graph", "merge", "index", "sample", "queries",
+)
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.process = psutil.Process()
+        self.interval = interval
+        self.start_rss = self.peak = self.process.memory_info().rss
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+class Stage:
+    """Wall time, item count, per-call latencies and peak RSS of one stage."""
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.latencies = []
+        self.seconds = 0.0
+        self.extra = {}
+
+    @contextmanager
+    def call(self, items=1):
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+
+    def __enter__(self):
+        self._rss = _RssSampler()
+        self._rss.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self._rss.stop()
+
+    def result(self) -> dict:
+        lat = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "seconds": round(self.seconds, 4),
+            "throughput": round(self.items / self.seconds, 3) if self.seconds else None,
+            "latency_ms": {
+                "calls": len(self.latencies),
+                "p50": round(float(np.percentile(lat, 50)), 3),
+                "p90": round(float(np.percentile(lat, 90)), 3),
+                "p99": round(float(np.percentile(lat, 99)), 3),
+                "max": round(float(lat.max()), 3),
+            },
+            "peak_rss_mb": round(self._rss.peak / 2 ** 20, 1),
+            "rss_growth_mb": round((self._rss.peak - self._rss.start_rss) / 2 ** 20, 1),
+            **self.extra,
+        }
+
+
+class _TimedTransformer:
+    # records the latency of every aconvert_to_graph_documents call
+    def __init__(self, inner, stage):
+        self.inner = inner
+        self.stage = stage
+
+    async def aconvert_to_graph_documents(self, docs):
+        start = time.perf_counter()
+        result = await self.inner.aconvert_to_graph_documents(docs)
+        self.stage.latencies.append(time.perf_counter() - start)
+        return result
+
+
+class _TimedLLM:
+    def __init__(self, inner, stage):
+        self.inner = inner
+        self.stage = stage
+
+    async def abatch(self, prompts, **kwargs):
+        start = time.perf_counter()
+        result = await self.inner.abatch(prompts, **kwargs)
+        self.stage.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run(args) -> dict:
+    from benchmarks import fixtures
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_")
+    selected = set(args.stages or STAGES)
+    results = {}
+
+    pdf = os.path.join(workdir, f"synthetic_{args.pages}_{args.seed}.pdf")
+    if not os.path.exists(pdf):
+        fixtures.make_pdf(pdf, pages=args.pages, seed=args.seed)
+
+    from text_preprocessing.text_preprocessing import iter_paragraphs
+
+    # paragraphs feed every later stage, so extraction always runs
+    with Stage("extract", "pages") as stage:
+        for _ in range(args.repeat):
+            with stage.call(args.pages):
+                records = list(iter_paragraphs(pdf, workers=args.workers, with_pages=True))
+    stage.extra["paragraphs"] = len(records)
+    results["extract"] = stage.result()
+
+    if "dedup" in selected:
+        from text_preprocessing.dedup import NearDuplicateFilter
+
+        dedup = NearDuplicateFilter(args.dedup_threshold)
+        unique = []
+        with Stage("dedup", "paragraphs") as stage:
+            for batch in _batches(records, 256):
+                with stage.call(len(batch)):
+                    unique.extend(dedup.filter(batch, key=lambda r: r[1]))
+        stage.extra.update(dedup.stats())
+        results["dedup"] = stage.result()
+        records = unique
+    paragraphs = [text for _, text in records]
+
+    if selected & {"summarize", "reduce"}:
+        import torch
+
+        from text_preprocessing.text_preprocessing import reduce_summaries, summarize_batch
+
+        torch.set_num_threads(args.threads)
+        tokenizer, model = fixtures.tiny_pegasus(workdir, seed=args.seed)
+        sample = paragraphs[:args.summarize_limit]
+        summaries = []
+        with Stage("summarize", "paragraphs") as stage:
+            for batch in _batches(sample, args.batch_size):
+                with stage.call(len(batch)):
+                    summaries.extend(
+                        summarize_batch(batch, tokenizer, model, batch_size=args.batch_size)
+                    )
+        results["summarize"] = stage.result()
+
+        if "reduce" in selected:
+            with Stage("reduce", "summaries") as stage:
+                with stage.call(len(summaries)):
+                    reduce_summaries(summaries, tokenizer, model, batch_size=args.batch_size)
+            results["reduce"] = stage.result()
+
+    from text_preprocessing.chunking import pack_chunks
+
+    with Stage("chunk", "paragraphs") as stage:
+        with stage.call(len(paragraphs)):
+            chunks = list(pack_chunks(records, args.chunk_tokens))
+    stage.extra["chunks"] = len(chunks)
+    results["chunk"] = stage.result()
+
+    if selected & {"graph", "merge", "index", "sample", "queries"}:
+        from generation.scheduler import ExtractionScheduler
+
+        transformer = fixtures.fake_graph_transformer(
+            latency=args.llm_latency, jitter=args.llm_latency / 2, seed=args.seed
+        )
+        graph_docs = []
+        with Stage("graph", "chunks") as stage:
+            scheduler = ExtractionScheduler(
+                _TimedTransformer(transformer, stage), max_in_flight=args.max_in_flight
+            )
+
+            async def collect():
+                async for doc in scheduler.stream(chunks):
+                    graph_docs.append(doc)
+
+            asyncio.run(collect())
+            stage.items = len(graph_docs)
+        stage.extra.update(scheduler.stats)
+        results["graph"] = stage.result()
+
+        from generation.graph_merge import GraphMerger
+
+        merger = GraphMerger()
+        with Stage("merge", "documents") as stage:
+            for doc in graph_docs:
+                with stage.call():
+                    merger.add(doc)
+            merged = merger.result()
+        stage.extra.update(nodes=len(merged.nodes), relationships=len(merged.relationships))
+        results["merge"] = stage.result()
+
+        from generation.graph_index import GraphIndex
+
+        with Stage("index", "relationships") as stage:
+            with stage.call(len(merged.relationships)):
+                index = GraphIndex.from_graph(merged)
+                index.save(os.path.join(workdir, "graph_index"))
+                index = GraphIndex.load(os.path.join(workdir, "graph_index"))
+        results["index"] = stage.result()
+
+        if "sample" in selected:
+            rng = np.random.default_rng(args.seed)
+            with Stage("sample", "samples") as stage:
+                for done in range(0, args.samples, 1000):
+                    size = min(1000, args.samples - done)
+                    starts = rng.integers(index.num_nodes, size=size)
+                    with stage.call(size):
+                        index.random_walks(starts, 4, rng)
+                        index.k_hop(starts[:10], 2)
+            results["sample"] = stage.result()
+
+        if "queries" in selected:
+            from benchmarks.fake_llm import FakeQueryLLM
+            from generation.queries_generation import agenerate_user_queries
+
+            llm = FakeQueryLLM(latency=args.llm_latency, jitter=args.llm_latency / 2, seed=args.seed)
+            output = os.path.join(workdir, "queries.jsonl")
+            for leftover in (output, f"{output}.ckpt"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            with Stage("queries", "prompts") as stage:
+                stats = asyncio.run(agenerate_user_queries(
+                    index, paragraphs, _TimedLLM(llm, stage), output, args.prompts,
+                    max_in_flight=args.max_in_flight, seed=args.seed,
+                ))
+                stage.items = stats["prompts"]
+            stage.extra.update(stats)
+            results["queries"] = stage.result()
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": {
+                k: v for k, v in vars(args).items()
+                if k not in ("out", "workdir", "metrics", "profile", "profile_mode")
+            },
+        },
+        "stages": {name: results[name] for name in STAGES if name in results},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--workdir", help="reuse generated PDFs and vocabularies between runs")
+    parser.add_argument("--stages", nargs="*", choices=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--dedup-threshold", type=float, default=0.8)
+    parser.add_argument("--summarize-limit", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--chunk-tokens", type=int, default=1024)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--prompts", type=int, default=500)
+    parser.add_argument("--metrics", help="also write pipeline metrics; .prom for Prometheus text, else JSON lines")
+    parser.add_argument("--profile", metavar="SPAN", help="capture one instrumented span, e.g. summarize")
+    parser.add_argument("--profile-mode", choices=("cprofile", "tracemalloc"), default="cprofile")
+    args = parser.parse_args()
+
+    from pipeline import instrumentation
+
+    if args.metrics or args.profile:
+        instrumentation.enable()
+    if args.profile:
+        instrumentation.profile_stage(args.profile, args.profile_mode)
+
+    report = run(args)
+    if args.metrics:
+        if args.metrics.endswith(".prom"):
+            with open(args.metrics, "w") as f:
+                f.write(instrumentation.prometheus_text())
+        else:
+            instrumentation.write_jsonl(args.metrics)
+        print(f"wrote {args.metrics}")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, stage in report["stages"].items():
+        lat = stage["latency_ms"]
+        print(
+            f"{name:<10} {stage['throughput'] or 0:>12.1f} {stage['unit']}/s"
+            f"   p50 {lat['p50']:>9.2f} ms   p99 {lat['p99']:>9.2f} ms"
+            f"   peak {stage['peak_rss_mb']:>8.1f} MB"
+        )
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
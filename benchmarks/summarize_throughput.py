@@ -0,0 +1,92 @@
+"""Paragraphs/sec of the batched summarizer vs. the old shared-model thread pool.
+
+    python -m benchmarks.summarize_throughput --pdf path/to/report.pdf
+    python -m benchmarks.summarize_throughput --model path/to/local/pegasus
+    python -m benchmarks.summarize_throughput --tiny
+
+Without ``--pdf`` a synthetic report is generated. ``--tiny`` swaps in the
+offline random Pegasus from ``benchmarks.fixtures``, so the comparison runs
+without a hub download; its numbers show the relative speedup only.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import torch
+from transformers import PegasusTokenizer, PegasusForConditionalGeneration
+
+from text_preprocessing.text_preprocessing import (
+    GENERATION_KWARGS,
+    extract_paragraphs,
+    summarize_batch,
+)
+
+
+def _summarize_one(text, tokenizer, model):
+    # the pre-batching summarize(): batch of one, no inference_mode
+    inputs = tokenizer(text, return_tensors="pt", truncation=True)
+    summary_ids = model.generate(inputs["input_ids"], **GENERATION_KWARGS)
+    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+
+
+def thread_pool_summaries(paragraphs, tokenizer, model, max_workers=10):
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_summarize_one, para, tokenizer, model)
+            for para in paragraphs
+        ]
+        for future in as_completed(futures):
+            summaries.append(future.result())
+    return summaries
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", help="default: a synthetic report")
+    parser.add_argument("--model", default="google/pegasus-cnn_dailymail",
+                        help="hub name or local directory")
+    parser.add_argument("--tiny", action="store_true", help="use the offline random Pegasus")
+    parser.add_argument("--workdir", help="reuse generated PDFs and vocabularies between runs")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    from benchmarks import fixtures
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_")
+    pdf = args.pdf or os.path.join(workdir, "synthetic_summarize.pdf")
+    if not os.path.exists(pdf):
+        fixtures.make_pdf(pdf, pages=max(1, args.limit // 3))
+    paragraphs = extract_paragraphs(pdf)[:args.limit]
+    if args.tiny:
+        tokenizer, model = fixtures.tiny_pegasus(workdir)
+    else:
+        tokenizer = PegasusTokenizer.from_pretrained(args.model)
+        model = PegasusForConditionalGeneration.from_pretrained(args.model).eval()
+
+    torch.set_num_threads(args.threads)
+    baseline = _timed(thread_pool_summaries, paragraphs, tokenizer, model)
+    batched = _timed(
+        summarize_batch, paragraphs, tokenizer, model,
+        batch_size=args.batch_size, num_threads=args.threads,
+    )
+
+    n = len(paragraphs)
+    print(f"paragraphs:        {n}")
+    print(f"thread pool (10):  {n / baseline:8.2f} paragraphs/sec ({baseline:.1f}s)")
+    print(f"batched (bs={args.batch_size:<3}):  {n / batched:8.2f} paragraphs/sec ({batched:.1f}s)")
+    print(f"speedup:           {baseline / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+_ARRAYS = (
+    "offsets",
+    "targets",
+    "edge_types",
+    "rev_offsets",
+    "rev_targets",
+    "rev_edge_types",
+    "node_types",
+    "string_offsets",
+    "strings",
+)
+
+
+def _csr(src, dst, types, num_nodes):
+    # edges grouped by source, then by type, so per-node slices are contiguous
+    order = np.lexsort((dst, types, src))
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=offsets[1:])
+    return offsets, dst[order].astype(np.int32), types[order].astype(np.int32)
+
+
+def _gather(offsets, nodes):
+    # concatenated neighbour lists of ``nodes`` without a Python loop
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), counts
+    shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return shift + np.arange(total), counts
+
+
+def _step(offsets, targets, current, rng):
+    # one uniform random out-edge per walker; -1 marks a walker with nowhere to go
+    if len(targets) == 0:
+        return np.full_like(current, -1)
+    alive = current >= 0
+    safe = np.where(alive, current, 0)
+    starts = offsets[safe]
+    degrees = offsets[safe + 1] - starts
+    alive &= degrees > 0
+    pick = starts + (rng.random(len(current)) * degrees).astype(np.int64)
+    return np.where(alive, targets[np.minimum(pick, len(targets) - 1)], -1)
+
+
+class GraphIndex:
+    """Immutable CSR view of a merged knowledge graph.
+
+    Nodes are the integers ``0..num_nodes-1``. Outgoing edges of node ``i``
+    are ``targets[offsets[i]:offsets[i + 1]]`` with matching ``edge_types``;
+    the ``rev_*`` arrays hold incoming edges the same way. Node names, node
+    types and relationship types all live in one UTF-8 string table: string
+    ``i`` is the name of node ``i``, while ``node_types`` and ``edge_types``
+    point at type labels stored after the names.
+
+    ``save`` writes every array as a ``.npy`` file and ``load`` memory-maps
+    them read-only, so worker processes share the pages instead of copying.
+    """
+
+    def __init__(self, arrays: dict, num_nodes: int):
+        self.num_nodes = num_nodes
+        for name in _ARRAYS:
+            array = arrays[name]
+            if isinstance(array, np.ndarray) and array.flags.writeable:
+                array.flags.writeable = False
+            setattr(self, name, array)
+        self._typed = {}
+        self._labels = None
+
+    # — construction —
+
+    @classmethod
+    def from_graph(cls, graph) -> "GraphIndex":
+        """Build from anything with ``.nodes`` and ``.relationships`` (e.g. ``MergedGraph``)."""
+        names = []
+        index = {}
+        labels = {}
+        node_type_labels = []
+
+        def node(n):
+            key = str(n.id)
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(names)
+                names.append(key)
+                node_type_labels.append(str(getattr(n, "type", "") or ""))
+            return i
+
+        for n in graph.nodes:
+            node(n)
+        src, dst, rel_labels = [], [], []
+        for r in graph.relationships:
+            src.append(node(r.source))
+            dst.append(node(r.target))
+            rel_labels.append(str(r.type))
+
+        num_nodes = len(names)
+
+        def label(text):
+            return labels.setdefault(text, num_nodes + len(labels))
+
+        node_types = np.fromiter((label(t) for t in node_type_labels), np.int32, num_nodes)
+        types = np.fromiter((label(t) for t in rel_labels), np.int32, len(rel_labels))
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+
+        offsets, targets, edge_types = _csr(src, dst, types, num_nodes)
+        rev_offsets, rev_targets, rev_edge_types = _csr(dst, src, types, num_nodes)
+
+        encoded = [s.encode("utf-8") for s in (*names, *labels)]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+        strings = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        return cls(
+            {
+                "offsets": offsets,
+                "targets": targets,
+                "edge_types": edge_types,
+                "rev_offsets": rev_offsets,
+                "rev_targets": rev_targets,
+                "rev_edge_types": rev_edge_types,
+                "node_types": node_types,
+                "string_offsets": string_offsets,
+                "strings": strings,
+            },
+            num_nodes,
+        )
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"format": FORMAT_VERSION, "num_nodes": self.num_nodes}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True) -> "GraphIndex":
+        with open(os.path.join(path, "index.json")) as f:
+            meta = json.load(f)
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"unsupported graph index format {meta['format']} in {path}")
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+            for name in _ARRAYS
+        }
+        return cls(arrays, meta["num_nodes"])
+
+    # — string table —
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.targets.shape[0])
+
+    def string(self, i: int) -> str:
+        start, end = self.string_offsets[i], self.string_offsets[i + 1]
+        return bytes(self.strings[start:end]).decode("utf-8")
+
+    def names(self, nodes) -> list[str]:
+        return [self.string(int(i)) for i in nodes]
+
+    def labels(self) -> dict:
+        """Type label -> string id, for node types and relationship types."""
+        if self._labels is None:
+            total = len(self.string_offsets) - 1
+            self._labels = {self.string(i): i for i in range(self.num_nodes, total)}
+        return self._labels
+
+    def type_id(self, label: str) -> int:
+        return self.labels()[label]
+
+    # — sampling —
+
+    def out_degree(self, nodes=None):
+        degrees = np.diff(self.offsets)
+        return degrees if nodes is None else degrees[nodes]
+
+    def edges_from(self, nodes):
+        """``(sources, types, targets)`` of every outgoing edge of ``nodes``."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        idx, counts = _gather(self.offsets, nodes)
+        return np.repeat(nodes, counts), self.edge_types[idx], self.targets[idx]
+
+    def k_hop(self, seeds, k: int, directed=False, max_nodes=None):
+        """Nodes within ``k`` hops of ``seeds``, ordered by hop distance."""
+        seen = np.zeros(self.num_nodes, dtype=bool)
+        frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+        seen[frontier] = True
+        found = [frontier]
+        for _ in range(k):
+            if frontier.size == 0:
+                break
+            idx, _ = _gather(self.offsets, frontier)
+            neighbours = self.targets[idx]
+            if not directed:
+                rev_idx, _ = _gather(self.rev_offsets, frontier)
+                neighbours = np.concatenate([neighbours, self.rev_targets[rev_idx]])
+            frontier = np.unique(neighbours[~seen[neighbours]]).astype(np.int64)
+            seen[frontier] = True
+            found.append(frontier)
+        nodes = np.concatenate(found)
+        return nodes if max_nodes is None else nodes[:max_nodes]
+
+    def subgraph_edges(self, nodes):
+        """``(sources, types, targets)`` of edges with both ends in ``nodes``."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        member = np.zeros(self.num_nodes, dtype=bool)
+        member[nodes] = True
+        src, types, dst = self.edges_from(nodes)
+        keep = member[dst]
+        return src[keep], types[keep], dst[keep]
+
+    def random_walks(self, starts, length: int, rng=None):
+        """Uniform random walks; returns ``(len(starts), length + 1)`` node ids, -1 padded."""
+        rng = rng or np.random.default_rng()
+        walks = np.full((len(starts), length + 1), -1, dtype=np.int64)
+        walks[:, 0] = starts
+        for step in range(length):
+            walks[:, step + 1] = _step(self.offsets, self.targets, walks[:, step], rng)
+        return walks
+
+    def _typed_csr(self, type_id: int):
+        # out-edges of a single relationship type, built once per type
+        csr = self._typed.get(type_id)
+        if csr is None:
+            mask = self.edge_types == type_id
+            sources = np.repeat(np.arange(self.num_nodes), np.diff(self.offsets))[mask]
+            offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=self.num_nodes), out=offsets[1:])
+            csr = self._typed[type_id] = (offsets, np.ascontiguousarray(self.targets[mask]))
+        return csr
+
+    def typed_paths(self, relation_types, n: int, rng=None, max_rounds=8):
+        """Sample ``n`` paths that follow ``relation_types`` in order.
+
+        Returns an ``(n, len(relation_types) + 1)`` array of node ids.
+        Walkers that reach a node without the next relation type are dropped
+        and replaced by a larger batch of new ones, sized by how many
+        survived, for up to ``max_rounds`` rounds. Fewer than ``n`` rows come
+        back only when such paths are that rare, and none when there are none.
+        """
+        rng = rng or np.random.default_rng()
+        type_ids = [self.type_id(t) if isinstance(t, str) else int(t) for t in relation_types]
+        if not type_ids:
+            return np.empty((0, 1), dtype=np.int64)
+
+        offsets, _ = self._typed_csr(type_ids[0])
+        candidates = np.flatnonzero(np.diff(offsets))
+        if candidates.size == 0 or n <= 0:
+            return np.empty((0, len(type_ids) + 1), dtype=np.int64)
+
+        found, total, size = [], 0, n
+        for _ in range(max_rounds):
+            paths = np.empty((size, len(type_ids) + 1), dtype=np.int64)
+            paths[:, 0] = rng.choice(candidates, size=size)
+            for step, type_id in enumerate(type_ids):
+                offsets, targets = self._typed_csr(type_id)
+                paths[:, step + 1] = _step(offsets, targets, paths[:, step], rng)
+            paths = paths[(paths >= 0).all(axis=1)]
+            found.append(paths)
+            total += len(paths)
+            if total >= n:
+                break
+            # enough walkers to cover the rest at this survival rate, capped at 64 * n
+            size = min(int(np.ceil((n - total) * size / max(len(paths), 1))), 64 * n)
+        return np.concatenate(found)[:n]
@@ -0,0 +1,252 @@
+import re
+
+from pipeline import instrumentation
+
+_PUNCT = re.compile(r"[^\w\s]")
+_TRAILING_ACRONYM = re.compile(r"^(.*?)\s*\(\s*([A-Za-z][A-Za-z0-9]{1,7})\s*\)\s*$")
+
+
+class MergedGraph:
+    # lightweight stand-in for GraphDocument: just .nodes and .relationships,
+    # plus whatever run stats the caller attaches
+    def __init__(self, nodes, relationships, stats=None):
+        self.nodes = nodes
+        self.relationships = relationships
+        self.stats = stats or {}
+
+
+# words the suffix rules below would wrongly strip: not plurals at all
+_NOT_PLURAL = frozenset({
+    "news", "series", "species", "means", "headquarters", "diabetes", "lens",
+    "bias", "alias", "atlas", "canvas", "chaos", "cosmos", "ethos", "pathos",
+    "physics", "mathematics", "economics", "statistics", "politics", "ethics",
+    "electronics", "analytics", "logistics", "genetics", "linguistics",
+    "robotics", "graphics", "semantics", "ergonomics", "athletics",
+})
+# plurals of -ie words, which the -ies rule would turn into -y
+_IE_PLURALS = frozenset({
+    "movies", "cookies", "calories", "zombies", "rookies", "selfies", "genies",
+    "prairies", "brownies", "smoothies", "goalies", "freebies", "newbies",
+})
+
+
+def _singular(word: str) -> str:
+    if word in _NOT_PLURAL:
+        return word
+    if len(word) > 4 and word.endswith("ies") and word not in _IE_PLURALS:
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name: str) -> str:
+    """Case-fold, drop punctuation and singularize each word of a node id.
+
+    All-caps words are acronyms and keep their final "S": HTTPS is not HTTP.
+    """
+    words = _PUNCT.sub(" ", name).split()
+    return " ".join(
+        w.casefold() if _looks_like_acronym(w) else _singular(w.casefold()) for w in words
+    )
+
+
+def _looks_like_acronym(name: str) -> bool:
+    name = name.strip()
+    return 2 <= len(name) <= 8 and name.isalnum() and name.isupper()
+
+
+class GraphMerger:
+    """Merge ``GraphDocument``s into one graph, one document at a time.
+
+    Node ids are interned to integers on their normalized name, and a
+    union-find over those integers folds aliases together: "LMS", "lms",
+    "Learning Management Systems (LMS)" and "Learning Management System" all
+    end up as one node. An acronym joins the long form it was spelled out
+    with, as in "Long Form (LF)"; a bare acronym joins a long form by its
+    initials only if exactly one long form has them, which ``result()``
+    decides over everything added so far. Only the first node object of
+    each group is kept and later properties are merged into it in place.
+    Relationships are deduplicated on ``(source, type, target)`` integer
+    tuples, so memory grows with the size of the merged graph rather than
+    with the number of chunks.
+    """
+
+    def __init__(self, acronyms=True):
+        self.acronyms = acronyms
+        self._ids = {}  # normalized name -> node int
+        self._parent = []  # union-find forest over node ints
+        self._nodes = []  # node int -> first node object seen for it
+        self._long_forms = {}  # initials of a multi-word name -> its node ints
+        self._paired = {}  # acronym -> long form it was spelled out with
+        self._acronym_keys = set()  # normalized names that were written as acronyms
+        self._types = {}  # relationship type -> int
+        self._rel_keys = set()
+        self._rels = []  # (src int, type int, tgt int, relationship)
+        self.documents = 0
+
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, a: int, b: int) -> int:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+        # the node seen first stays the representative
+        if b < a:
+            a, b = b, a
+        self._parent[b] = a
+        _merge_properties(self._nodes[a], self._nodes[b], overwrite=False)
+        self._nodes[b] = None
+        return a
+
+    def _intern(self, key: str, node) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self._parent)
+            self._parent.append(i)
+            self._nodes.append(node)
+        return i
+
+    def _add_alias(self, key: str, i: int) -> int:
+        j = self._ids.get(key)
+        if j is None:
+            self._ids[key] = i
+            return i
+        return self._union(i, j)
+
+    def node_index(self, node) -> int:
+        """Integer id of the merged node that ``node`` belongs to."""
+        name = str(node.id)
+        i = self._intern(normalize_name(name), node)
+        if not self.acronyms:
+            return self._find(i)
+
+        m = _TRAILING_ACRONYM.match(name)
+        if m and m.group(1):
+            # "Learning Management Systems (LMS)" names both forms; an acronym
+            # spelled out two different ways keeps the first
+            long_form, short_form = normalize_name(m.group(1)), normalize_name(m.group(2))
+            i = self._add_alias(long_form, i)
+            if self._paired.setdefault(short_form, long_form) == long_form:
+                i = self._add_alias(short_form, i)
+            words = long_form.split()
+        else:
+            words = normalize_name(name).split()
+
+        if len(words) > 1:
+            self._long_forms.setdefault("".join(w[0] for w in words), set()).add(i)
+        elif _looks_like_acronym(name):
+            self._acronym_keys.add(words[0])
+
+        return self._find(i)
+
+    def _acronym_aliases(self) -> dict:
+        # a bare acronym joins a long form only when no other long form shares
+        # its initials; "AI" next to both "Artificial Intelligence" and
+        # "Adobe Illustrator" stays on its own. This is only a view of the data
+        # so far, so the answer is not made permanent: a later "Long Form (LF)"
+        # or a second long form can still change it.
+        aliases = {}  # acronym root -> long form root
+        for key in self._acronym_keys:
+            if key in self._paired:
+                continue
+            roots = {self._find(i) for i in self._long_forms.get(key, ())}
+            acronym = self._find(self._ids[key])
+            if len(roots) == 1 and acronym not in roots:
+                aliases[acronym] = roots.pop()
+        for acronym, root in aliases.items():
+            while root in aliases:
+                root = aliases[root]
+            aliases[acronym] = root
+        return aliases
+
+    def add(self, graph_doc):
+        """Fold one ``GraphDocument`` into the merged graph."""
+        with instrumentation.span("merge"):
+            self._add(graph_doc)
+        if instrumentation.enabled():
+            instrumentation.count("merge_nodes_in", len(graph_doc.nodes))
+            instrumentation.count("merge_relationships_in", len(graph_doc.relationships))
+
+    def _add(self, graph_doc):
+        self.documents += 1
+        for n in graph_doc.nodes:
+            i = self.node_index(n)
+            existing = self._nodes[i]
+            if existing is not n:
+                _merge_properties(existing, n, overwrite=True)
+
+        for r in graph_doc.relationships:
+            src = self.node_index(r.source)
+            tgt = self.node_index(r.target)
+            rel_type = self._types.setdefault(r.type, len(self._types))
+            key = (src, rel_type, tgt)
+            if key not in self._rel_keys:
+                self._rel_keys.add(key)
+                self._rels.append((src, rel_type, tgt, r))
+
+    def result(self) -> MergedGraph:
+        """Snapshot of the merged graph with relationships pointing at merged nodes."""
+        find = self._find
+        aliases = self._acronym_aliases() if self.acronyms else {}
+        nodes = {
+            i: n for i, n in enumerate(self._nodes)
+            if n is not None and find(i) == i and i not in aliases
+        }
+        for acronym, root in aliases.items():
+            if nodes[root] is self._nodes[root]:
+                # merge into a copy, leaving the stored node as it was
+                nodes[root] = _copy_node(nodes[root])
+            _merge_properties(nodes[root], self._nodes[acronym], overwrite=False)
+
+        seen = set()
+        compacted = []
+        shown = set()
+        relationships = []
+        for src, rel_type, tgt, r in self._rels:
+            # unions made after a relationship was added can turn it into a duplicate
+            key = (find(src), rel_type, find(tgt))
+            if key in seen:
+                continue
+            seen.add(key)
+            compacted.append((*key, r))
+            src, tgt = aliases.get(key[0], key[0]), aliases.get(key[2], key[2])
+            if (src, rel_type, tgt) in shown:
+                continue
+            shown.add((src, rel_type, tgt))
+            r.source = nodes[src]
+            r.target = nodes[tgt]
+            relationships.append(r)
+        self._rels = compacted
+        self._rel_keys = seen
+
+        return MergedGraph([nodes[i] for i in sorted(nodes)], relationships)
+
+
+def _copy_node(node):
+    update = {
+        attr: dict(getattr(node, attr))
+        for attr in ("properties", "metadata")
+        if getattr(node, attr, None) is not None
+    }
+    return node.model_copy(update=update)
+
+
+def _merge_properties(existing, new, overwrite: bool):
+    for attr in ("properties", "metadata"):
+        incoming = getattr(new, attr, None)
+        if not incoming:
+            continue
+        current = getattr(existing, attr, None)
+        if current is None:
+            setattr(existing, attr, dict(incoming))
+        elif overwrite:
+            current.update(incoming)
+        else:
+            for k, v in incoming.items():
+                current.setdefault(k, v)
@@ -1,71 +1,107 @@
 import asyncio
-from langchain_core.documents import Document
-from langchain_experimental.graph_transformers import LLMGraphTransformer
-from langchain.llms.ollama import Ollama
-from generation.queries_generation import generate_user_queries
+from functools import lru_cache
 
-# 1) set up your LLM & transformer once
-llm = Ollama(model="llama3", verbose=True)
-graph_transformer = LLMGraphTransformer(llm=llm)
+from generation.graph_merge import GraphMerger
+from generation.scheduler import ExtractionScheduler
+from pipeline import instrumentation
+from pipeline.cache import ResultCache
+from text_preprocessing.chunking import Chunk, approx_token_count, pack_chunks
+from text_preprocessing.dedup import NearDuplicateFilter
+from text_preprocessing.text_preprocessing import iter_paragraphs
 
+LLM_MODEL = "llama3"
 
-# 2) utility to extract a graph from one text chunk
-async def _extract_one(text: str):
-    docs = [Document(page_content=text)]
-    # returns a list of GraphDocument, but we only ever
-    # gave it one Document, so take [0]
-    return (await graph_transformer.aconvert_to_graph_documents(docs))[0]
 
+# 1) set up your LLM & transformer once, on first use rather than at import
+@lru_cache(maxsize=None)
+def get_llm(model: str = LLM_MODEL):
+    from langchain.llms.ollama import Ollama
 
-# 3) batch‐extract graphs for N chunks in parallel
-async def extract_graphs(texts: list[str]):
-    tasks = [_extract_one(t) for t in texts]
-    return await asyncio.gather(*tasks)  # -> list[GraphDocument]
+    return Ollama(model=model, verbose=True)
 
 
-# 4) merge a list of GraphDocument into one
-def merge_graph_documents(graph_docs):
-    # simple stand‐in in case you can't import the real GraphDocument class
-    class MergedGraph:
-        def __init__(self, nodes, relationships):
-            self.nodes = nodes
-            self.relationships = relationships
+@lru_cache(maxsize=None)
+def get_graph_transformer(model: str = LLM_MODEL):
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
 
-    node_map = {}  # id -> node
-    rel_set = set()  # (src, type, tgt)
-    rel_list = []
+    return LLMGraphTransformer(llm=get_llm(model))
 
+
+def _cache_key(text: str):
+    # anything that changes what the LLM is asked, or how, changes the key
+    llm = get_llm()
+    graph_transformer = get_graph_transformer()
+    return ResultCache.make_key(
+        text,
+        llm.model,
+        kind="graph",
+        llm_params=llm._identifying_params,
+        allowed_nodes=graph_transformer.allowed_nodes,
+        allowed_relationships=graph_transformer.allowed_relationships,
+    )
+
+
+# 2) batch‐extract graphs for N chunks, a bounded number at a time
+def make_scheduler(cache: ResultCache | None = None, **options):
+    return ExtractionScheduler(
+        get_graph_transformer(), cache=cache, cache_key=_cache_key, **options
+    )
+
+
+async def extract_graphs(texts: list[str], cache: ResultCache | None = None, **options):
+    return await make_scheduler(cache, **options).run(texts)  # -> list[GraphDocument]
+
+
+# 3) merge GraphDocuments into one, normalizing entity names on the way
+@instrumentation.timed("merge_graph_documents")
+def merge_graph_documents(graph_docs, merger: GraphMerger | None = None):
+    merger = merger or GraphMerger()
     for doc in graph_docs:
-        # merge nodes
-        for n in doc.nodes:
-            if n.id not in node_map:
-                node_map[n.id] = n
-            else:
-                # optional: merge metadata dicts
-                if getattr(n, "metadata", None):
-                    existing = node_map[n.id]
-                    existing.metadata = {
-                        **(existing.metadata or {}),
-                        **n.metadata
-                    }
-        # merge relationships
-        for r in doc.relationships:
-            key = (r.source.id, r.type, r.target.id)
-            if key not in rel_set:
-                rel_set.add(key)
-                rel_list.append(r)
-
-    # return a lightweight object with .nodes and .relationships
-    return MergedGraph(list(node_map.values()), rel_list)
-
-
-# 5) bring it all together
-def build_and_merge(text_chunks: list[str]):
-    graph_docs = asyncio.run(extract_graphs(text_chunks))
-    merged = merge_graph_documents(graph_docs)
+        merger.add(doc)
+    # returns a lightweight object with .nodes and .relationships
+    return merger.result()
+
+
+# 4) bring it all together: merge each graph as soon as it is extracted
+async def _extract_and_merge(text_chunks, cache, **options):
+    merger = GraphMerger()
+    scheduler = make_scheduler(cache, **options)
+    async for doc in scheduler.stream(text_chunks):
+        merger.add(doc)
+    merged = merger.result()
+    merged.stats = dict(scheduler.stats)
     return merged
 
 
+def build_and_merge(
+    text_chunks: list[str | Chunk],
+    cache: ResultCache | None = None,
+    dedup_threshold: float | None = 0.8,
+    **options,
+):
+    if dedup_threshold:
+        options["dedup"] = NearDuplicateFilter(dedup_threshold)
+    return asyncio.run(_extract_and_merge(text_chunks, cache, **options))
+
+
+# 5) straight from a PDF: body paragraphs packed into token-budgeted chunks
+def build_from_pdf(
+    pdf_path,
+    max_tokens: int = 1024,
+    overlap_tokens: int = 0,
+    count_tokens=approx_token_count,
+    cache: ResultCache | None = None,
+    dedup_threshold: float | None = 0.8,
+    **options,
+):
+    # repeated paragraphs rarely make whole chunks near-duplicates, so they are
+    # dropped before packing; build_and_merge still skips repeated chunks
+    dedup = NearDuplicateFilter(dedup_threshold) if dedup_threshold else None
+    paragraphs = iter_paragraphs(pdf_path, dedup=dedup, with_pages=True)
+    chunks = pack_chunks(paragraphs, max_tokens, overlap_tokens, count_tokens)
+    return build_and_merge(chunks, cache, dedup_threshold, **options)
+
+
 # — example usage —
 if __name__ == "__main__":
     chunks = [
@@ -258,6 +294,7 @@ if __name__ == "__main__":
     ]
 
     merged_graph = build_and_merge(chunks)
+    print(merged_graph.stats)
 
     # now you can visualize it:
     from pyvis.network import Network
@@ -267,4 +304,13 @@ if __name__ == "__main__":
         net.add_node(n.id, label=n.id, title=n.type)
     for r in merged_graph.relationships:
         net.add_edge(r.source.id, r.target.id, label=r.type)
-    net.save_graph("knowledge_graph.html")
\ No newline at end of file
+    net.save_graph("knowledge_graph.html")
+
+    # and sample synthetic user queries from it
+    from generation.graph_index import GraphIndex
+    from generation.queries_generation import generate_user_queries
+
+    stats = generate_user_queries(
+        GraphIndex.from_graph(merged_graph), chunks, get_llm(), "queries.jsonl", n_prompts=100
+    )
+    print(stats)
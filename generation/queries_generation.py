@@ -0,0 +1,289 @@
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import re
+
+import numpy as np
+
+from generation.graph_merge import normalize_name
+from generation.scheduler import run_pipeline
+from pipeline import instrumentation
+from text_preprocessing.dedup import NearDuplicateFilter
+
+PROMPT = """You are helping build a set of realistic user queries for a document.
+
+Facts from the document's knowledge graph:
+{facts}
+
+Excerpt from the document:
+{excerpt}
+
+Write {n} different questions a real user of this document might type into a search box or ask an assistant. Vary wording and difficulty, and make every question answerable from the facts or the excerpt. Answer with a JSON list of strings and nothing else."""
+
+_LIST_PREFIX = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+class QuerySampler:
+    """Draws prompt material from a ``GraphIndex`` and the source paragraphs.
+
+    Sample ``i`` is a function of ``(seed, i)`` only, so a resumed run sees
+    exactly the samples an uninterrupted run would have.
+    """
+
+    def __init__(self, index, paragraphs, seed=0, hops=1, max_nodes=12,
+                 max_facts=15, max_paragraphs=2, queries_per_prompt=3):
+        self.index = index
+        self.paragraphs = paragraphs
+        self.seed = seed
+        self.hops = hops
+        self.max_nodes = max_nodes
+        self.max_facts = max_facts
+        self.max_paragraphs = max_paragraphs
+        self.queries_per_prompt = queries_per_prompt
+
+        degrees = np.diff(index.offsets) + np.diff(index.rev_offsets)
+        self._seeds = np.flatnonzero(degrees)
+        if self._seeds.size == 0:
+            self._seeds = np.arange(index.num_nodes)
+        self._postings = _build_postings(paragraphs)
+
+    def _mentions(self, name: str):
+        # paragraphs containing every word of the node name
+        words = set(normalize_name(name).split())
+        postings = sorted((self._postings.get(w, ()) for w in words), key=len)
+        if not postings or not postings[0]:
+            return []
+        found = set(postings[0])
+        for ids in postings[1:]:
+            found.intersection_update(ids)
+        return sorted(found)
+
+    def sample(self, i: int) -> dict:
+        rng = np.random.default_rng([self.seed, i])
+        index = self.index
+        seed_node = int(rng.choice(self._seeds))
+        nodes = index.k_hop([seed_node], self.hops, max_nodes=self.max_nodes)
+
+        src, types, dst = index.subgraph_edges(nodes)
+        if len(src) > self.max_facts:
+            keep = np.sort(rng.choice(len(src), self.max_facts, replace=False))
+            src, types, dst = src[keep], types[keep], dst[keep]
+        triples = [
+            (index.string(s), index.string(t), index.string(d))
+            for s, t, d in zip(src.tolist(), types.tolist(), dst.tolist())
+        ]
+
+        paragraph_ids = self._mentions(index.string(seed_node))
+        if not paragraph_ids and self.paragraphs:
+            paragraph_ids = [int(rng.integers(len(self.paragraphs)))]
+        if len(paragraph_ids) > self.max_paragraphs:
+            paragraph_ids = sorted(
+                rng.choice(paragraph_ids, self.max_paragraphs, replace=False).tolist()
+            )
+
+        facts = "\n".join(f"- {h} -[{r}]-> {t}" for h, r, t in triples)
+        if not facts:
+            facts = f"- {index.string(seed_node)}"
+        excerpt = "\n\n".join(self.paragraphs[p] for p in paragraph_ids)
+        return {
+            "sample": i,
+            "nodes": index.names(nodes),
+            "triples": triples,
+            "paragraphs": paragraph_ids,
+            "prompt": PROMPT.format(facts=facts, excerpt=excerpt, n=self.queries_per_prompt),
+        }
+
+
+def _build_postings(paragraphs):
+    postings = {}
+    for i, para in enumerate(paragraphs):
+        for word in set(normalize_name(para).split()):
+            postings.setdefault(word, []).append(i)
+    return postings
+
+
+def parse_queries(text) -> list[str]:
+    """Queries from an LLM answer: a JSON list if possible, else one per line."""
+    text = getattr(text, "content", text).strip()
+    start, end = text.find("["), text.rfind("]")
+    if start != -1 and end > start:
+        try:
+            queries = json.loads(text[start:end + 1])
+            return [str(q).strip() for q in queries if str(q).strip()]
+        except json.JSONDecodeError:
+            pass
+    lines = (_LIST_PREFIX.sub("", line).strip().strip('"') for line in text.splitlines())
+    return [line for line in lines if line.endswith("?")]
+
+
+class CheckpointedJsonlWriter:
+    """Append-only JSONL output with fsync'd checkpoints.
+
+    Records are buffered and written in bulk. Every ``checkpoint_every``
+    records the file is flushed and fsync'd, and ``<path>.ckpt`` is
+    atomically replaced with the byte length of the file and the next sample
+    to produce. Reopening truncates anything written after the last
+    checkpoint and reports where to resume. An existing file without a
+    checkpoint was not written by this class and is only replaced with
+    ``overwrite=True``.
+    """
+
+    def __init__(self, path, checkpoint_every=1000, buffer_size=1 << 20, overwrite=False):
+        self.path = path
+        self.checkpoint_path = f"{path}.ckpt"
+        self.checkpoint_every = checkpoint_every
+
+        state = {"next_sample": 0, "records": 0, "bytes": 0}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                state.update(json.load(f))
+        elif os.path.exists(path) and os.path.getsize(path) and not overwrite:
+            raise FileExistsError(f"{path} exists and has no checkpoint; pass overwrite=True to replace it")
+        self.next_sample = state["next_sample"]
+        self.records = state["records"]
+        self._since_checkpoint = 0
+
+        self._file = open(path, "ab", buffering=buffer_size)
+        self._file.truncate(state["bytes"])
+
+    def write(self, records, next_sample: int):
+        if records:
+            self._file.write(b"".join(
+                json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records
+            ))
+            self.records += len(records)
+            self._since_checkpoint += len(records)
+        self.next_sample = next_sample
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        state = {
+            "next_sample": self.next_sample,
+            "records": self.records,
+            "bytes": os.fstat(self._file.fileno()).st_size,
+        }
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def close(self):
+        self.checkpoint()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def agenerate_user_queries(
+    index,
+    paragraphs,
+    llm,
+    output_path,
+    n_prompts: int,
+    queries_per_prompt=3,
+    max_in_flight=4,
+    batch_size=8,
+    checkpoint_every=1000,
+    seed=0,
+    dedup_threshold=0.9,
+    dedup_capacity=100_000,
+    overwrite=False,
+    **sampler_options,
+):
+    """Generate queries for samples ``0..n_prompts-1`` into ``output_path``.
+
+    Up to ``max_in_flight`` ``llm.abatch`` calls of ``batch_size`` prompts run
+    at once. Results are written in sample order, and the producer never gets
+    more than a bounded window ahead of the writer, so memory stays flat no
+    matter how many queries are generated. Rerunning with the same arguments
+    after a crash resumes from the last checkpoint. Queries that nearly repeat
+    one of the last ``dedup_capacity`` written are dropped when
+    ``dedup_threshold`` is set; that window bounds the filter's memory at
+    about 1 KB per query. An existing ``output_path`` without a checkpoint
+    is an error unless ``overwrite`` is set.
+    """
+    sampler = QuerySampler(
+        index, paragraphs, seed=seed, queries_per_prompt=queries_per_prompt,
+        **sampler_options,
+    )
+    stats = {"prompts": 0, "queries": 0, "duplicates": 0, "failed": 0}
+    window = max_in_flight * batch_size * 2
+    dedup = NearDuplicateFilter(dedup_threshold, capacity=dedup_capacity) if dedup_threshold else None
+
+    with CheckpointedJsonlWriter(output_path, checkpoint_every, overwrite=overwrite) as writer:
+        if dedup is not None and writer.records:
+            # a resumed run must not repeat what was written before the crash;
+            # only the queries the filter would still remember are hashed
+            with open(output_path, "rb") as f:
+                for line in collections.deque(f, maxlen=dedup_capacity):
+                    dedup.add(json.loads(line)["query"])
+        progress = asyncio.Condition()
+        first = writer.next_sample
+
+        async def feed(submit, emit):
+            for start in range(first, n_prompts, batch_size):
+                async with progress:
+                    await progress.wait_for(lambda: start - writer.next_sample < window)
+                stop = min(start + batch_size, n_prompts)
+                await submit([sampler.sample(i) for i in range(start, stop)])
+
+        async def work(samples):
+            with instrumentation.span("queries_llm"):
+                answers = await llm.abatch(
+                    [s["prompt"] for s in samples], return_exceptions=True
+                )
+            for item in zip(samples, answers):
+                yield item
+
+        pending = {}
+        results = run_pipeline(feed, work, max_in_flight, inbox_size=max_in_flight, name="queries")
+        async with contextlib.aclosing(results):
+            async for s, answer in results:
+                pending[s["sample"]] = (s, answer)
+                instrumentation.gauge("queries_reorder_depth", len(pending))
+
+                records = []
+                next_sample = writer.next_sample
+                while next_sample in pending:
+                    s, answer = pending.pop(next_sample)
+                    next_sample += 1
+                    stats["prompts"] += 1
+                    if isinstance(answer, Exception):
+                        stats["failed"] += 1
+                        print(f"Error generating queries for sample {s['sample']}: {answer!r}")
+                        continue
+                    for j, query in enumerate(parse_queries(answer)):
+                        if dedup is not None and dedup.is_duplicate(query):
+                            stats["duplicates"] += 1
+                            continue
+                        records.append({
+                            "id": f"{s['sample']}-{j}",
+                            "query": query,
+                            "nodes": s["nodes"],
+                            "triples": s["triples"],
+                            "paragraphs": s["paragraphs"],
+                        })
+                stats["queries"] += len(records)
+                writer.write(records, next_sample)
+                async with progress:
+                    progress.notify_all()
+
+    return stats
+
+
+def generate_user_queries(index, paragraphs, llm, output_path="queries.jsonl", n_prompts=1000, **options):
+    return asyncio.run(
+        agenerate_user_queries(index, paragraphs, llm, output_path, n_prompts, **options)
+    )
@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import random
+
+from langchain_core.documents import Document
+
+from pipeline import instrumentation
+
+_DONE = object()
+
+
+class _Failed:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _text(item):
+    # plain strings, or packed chunks carrying .text and provenance .metadata
+    return getattr(item, "text", item)
+
+
+def _metadata(item):
+    return dict(getattr(item, "metadata", None) or {})
+
+
+async def run_pipeline(feed, work, workers, inbox_size, outbox_size=0, name=None):
+    """Yield the results of ``workers`` concurrent ``work`` calls, in completion order.
+
+    ``feed(submit, emit)`` is a coroutine that hands batches to the workers
+    with ``await submit(batch)``, waiting while ``inbox_size`` are queued,
+    and may pass ready results straight through with ``await emit(result)``.
+    ``work(batch)`` is an async generator of results. An exception in either
+    is raised here rather than leaving the consumer waiting, and every task
+    is cancelled when the consumer stops. With ``name``, queue depths are
+    recorded as ``<name>_inbox_depth`` and ``<name>_outbox_depth`` gauges.
+    """
+    inbox = asyncio.Queue(maxsize=inbox_size)
+    outbox = asyncio.Queue(maxsize=outbox_size)
+
+    async def submit(batch):
+        await inbox.put(batch)
+        if name is not None:
+            instrumentation.gauge(f"{name}_inbox_depth", inbox.qsize())
+
+    async def stop_workers():
+        for _ in range(workers):
+            await inbox.put(None)
+
+    async def feeder():
+        try:
+            await feed(submit, outbox.put)
+        except asyncio.CancelledError:
+            # the consumer has stopped and cancels the workers itself; waiting
+            # for room in a full inbox here would never return
+            raise
+        except Exception:
+            await stop_workers()
+            raise
+        await stop_workers()
+
+    async def worker():
+        try:
+            while (batch := await inbox.get()) is not None:
+                async for result in work(batch):
+                    await outbox.put(result)
+        except Exception as exc:
+            # hand the failure to the consumer instead of leaving it waiting
+            await outbox.put(_Failed(exc))
+            return
+        await outbox.put(_DONE)
+
+    feed_task = asyncio.create_task(feeder())
+    tasks = [feed_task, *(asyncio.create_task(worker()) for _ in range(workers))]
+    running = workers
+    try:
+        while running:
+            item = await outbox.get()
+            if name is not None:
+                instrumentation.gauge(f"{name}_outbox_depth", outbox.qsize())
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, _Failed):
+                raise item.exc
+            yield item
+        # surfaces errors raised by ``feed`` itself
+        await feed_task
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class ExtractionScheduler:
+    """Bounded-concurrency graph extraction that streams results.
+
+    At most ``max_in_flight`` ``aconvert_to_graph_documents`` calls run at a
+    time, each on up to ``batch_size`` chunks. A call that raises or exceeds
+    ``timeout`` seconds per chunk is retried ``retries`` times with jittered
+    exponential backoff; chunks that still fail are recorded in ``failed``
+    instead of sinking the whole run. Graph documents are yielded as soon as
+    their call finishes. Inputs are strings or ``Chunk``s, whose provenance
+    ends up in each graph document's ``source.metadata``. With a
+    ``NearDuplicateFilter`` as ``dedup``, chunks that nearly repeat an
+    earlier one are skipped without an LLM call.
+    """
+
+    def __init__(
+        self,
+        transformer,
+        max_in_flight=4,
+        batch_size=1,
+        timeout=120.0,
+        retries=2,
+        backoff=1.0,
+        cache=None,
+        cache_key=None,
+        dedup=None,
+    ):
+        self.transformer = transformer
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.cache_key = cache_key
+        self.dedup = dedup
+        self.failed = []  # (index, text, exception)
+        self.stats = {"completed": 0, "cached": 0, "duplicates": 0, "retried": 0, "failed": 0}
+
+    async def _convert(self, batch):
+        docs = [
+            Document(page_content=_text(item), metadata=_metadata(item))
+            for _, item in batch
+        ]
+        if instrumentation.enabled():
+            instrumentation.count("graph_chunks", len(docs))
+            instrumentation.count("graph_chunk_bytes", sum(len(d.page_content.encode()) for d in docs))
+        for attempt in range(self.retries + 1):
+            try:
+                with instrumentation.span("graph_extract"):
+                    return await asyncio.wait_for(
+                        self.transformer.aconvert_to_graph_documents(docs),
+                        self.timeout * len(docs),
+                    )
+            except Exception as exc:
+                if attempt == self.retries:
+                    print(f"Error extracting graph from {len(docs)} chunk(s): {exc!r}")
+                    instrumentation.count("graph_failed", len(batch))
+                    self.stats["failed"] += len(batch)
+                    self.failed.extend((i, _text(item), exc) for i, item in batch)
+                    return None
+                instrumentation.count("graph_retries")
+                self.stats["retried"] += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def stream_indexed(self, texts):
+        """Yield ``(chunk_index, GraphDocument)`` pairs in completion order."""
+
+        async def feed(submit, emit):
+            batch = []
+            for i, item in enumerate(texts):
+                text = _text(item)
+                if self.dedup is not None and self.dedup.is_duplicate(text):
+                    self.stats["duplicates"] += 1
+                    continue
+                if self.cache is not None:
+                    cached = self.cache.get(self.cache_key(text))
+                    if cached is not None:
+                        instrumentation.count("graph_cache_hits")
+                        self.stats["cached"] += 1
+                        # the cached document carries the provenance of whichever
+                        # chunk was extracted first; this chunk keeps its own
+                        source = Document(page_content=text, metadata=_metadata(item))
+                        await emit((i, cached.model_copy(update={"source": source})))
+                        continue
+                batch.append((i, item))
+                if len(batch) == self.batch_size:
+                    await submit(batch)
+                    batch = []
+            if batch:
+                await submit(batch)
+
+        async def work(batch):
+            graph_docs = await self._convert(batch)
+            for (i, item), graph_doc in zip(batch, graph_docs or ()):
+                if self.cache is not None:
+                    self.cache.set(self.cache_key(_text(item)), graph_doc)
+                self.stats["completed"] += 1
+                yield i, graph_doc
+
+        results = run_pipeline(
+            feed, work, self.max_in_flight,
+            inbox_size=self.max_in_flight * 2,
+            outbox_size=self.max_in_flight * self.batch_size * 2,
+            name="graph",
+        )
+        async with contextlib.aclosing(results):
+            async for item in results:
+                yield item
+
+    async def stream(self, texts):
+        """Yield ``GraphDocument``s as they complete."""
+        async for _, graph_doc in self.stream_indexed(texts):
+            yield graph_doc
+
+    async def run(self, texts):
+        """Extract all chunks; returns graph documents in input order."""
+        results = {}
+        async for i, graph_doc in self.stream_indexed(texts):
+            results[i] = graph_doc
+        return [results[i] for i in sorted(results)]
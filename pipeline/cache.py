@@ -0,0 +1,152 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class ResultCache:
+    """Content-addressed SQLite store for expensive model outputs.
+
+    Keys are hashes of the input text, the model name and the generation or
+    prompt parameters, so any change to one of them is a miss. Values are
+    pickled. Once the stored values exceed ``max_bytes`` the least recently
+    read entries are evicted.
+
+    Reads never write: access times are buffered and flushed with the next
+    ``set``, on ``close`` or every ``touch_batch`` hits, so several processes
+    can read one cache file without queueing on its write lock.
+    """
+
+    def __init__(self, path, max_bytes=2 * 1024 ** 3, touch_batch=512):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched = {}  # key -> last read time, not yet written
+        self._lock = threading.Lock()
+        # writers from other processes wait this long for the lock before failing
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        # running byte total, kept by triggers in the same transaction as every
+        # insert and delete, so eviction never has to scan the table; REPLACE
+        # only fires the delete trigger with recursive_triggers on
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (name, value)"
+            " SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN"
+            " UPDATE meta SET value = value + NEW.size WHERE name = 'bytes'; END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN"
+            " UPDATE meta SET value = value - OLD.size WHERE name = 'bytes'; END"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, **params) -> str:
+        payload = json.dumps(
+            {"text": text, "model": model, "params": params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+        return pickle.loads(row[0])
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET accessed = ? WHERE key = ?",
+                [(t, key) for key, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def set(self, key: str, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            # eviction order must see the reads made since the last write
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self):
+        # read inside the write transaction: other processes may share the file
+        total = self._total_bytes()
+        while total > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = self._total_bytes()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
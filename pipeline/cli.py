@@ -0,0 +1,197 @@
+"""Command line entry point for the pipeline.
+
+    python -m pipeline paragraphs report.pdf
+    python -m pipeline summarize report.pdf --reduce --cache cache.sqlite
+    python -m pipeline graph report.pdf --out graph.json
+    python -m pipeline corpus reports/ --workers 8 --graph --out corpus.jsonl
+    python -m pipeline worker --socket /tmp/pipeline.sock
+    python -m pipeline send --socket /tmp/pipeline.sock '{"op": "summarize", "pdf": "report.pdf"}'
+
+``worker`` loads the model once and then serves JSON-line jobs from stdin,
+or from a Unix socket with ``--socket``, so small jobs skip the cold start.
+"""
+import argparse
+import json
+import os
+import sys
+
+from pipeline import instrumentation
+
+
+def _open_cache(args):
+    if not args.cache:
+        return None
+    from pipeline.cache import ResultCache
+
+    return ResultCache(args.cache)
+
+
+def _worker(args):
+    from pipeline.worker import Worker
+
+    return Worker(
+        model_name=args.model,
+        device=args.device,
+        cache=_open_cache(args),
+        batch_size=args.batch_size,
+        num_threads=args.threads,
+    )
+
+
+def cmd_paragraphs(args):
+    from text_preprocessing.dedup import NearDuplicateFilter
+    from text_preprocessing.text_preprocessing import iter_paragraphs
+
+    dedup = NearDuplicateFilter(args.dedup_threshold) if args.dedup_threshold else None
+    for p in iter_paragraphs(args.pdf, dedup=dedup):
+        print(f"{p}\n")
+
+
+def _run_one(args, request):
+    worker = _worker(args)
+    reply = worker.handle(request)
+    if not reply["ok"]:
+        print(f"Error: {reply['error']}", file=sys.stderr)
+        return 1
+    text = json.dumps(reply["result"], indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+def cmd_summarize(args):
+    return _run_one(args, {"op": "summarize", "pdf": args.pdf, "reduce": args.reduce,
+                           "dedup_threshold": args.dedup_threshold})
+
+
+def cmd_graph(args):
+    options = {"max_in_flight": args.max_in_flight}
+    return _run_one(args, {"op": "graph", "pdf": args.pdf, "max_tokens": args.max_tokens,
+                           "options": options})
+
+
+def cmd_corpus(args):
+    from pipeline.corpus import CorpusRunner, iter_pdfs
+
+    runner = CorpusRunner(
+        workers=args.workers,
+        threads_per_worker=args.threads or 1,
+        reduce=args.reduce,
+        graph=args.graph,
+        model_name=args.model,
+        cache_path=args.cache,
+        batch_size=args.batch_size,
+        pin_cpus=args.pin_cpus,
+    )
+    merged = runner.run(iter_pdfs(args.root), args.out)
+    if args.graph_out:
+        from pipeline.worker import graph_json
+
+        with open(args.graph_out, "w") as f:
+            json.dump(graph_json(merged), f, ensure_ascii=False)
+    print(merged.stats, file=sys.stderr)
+    return 1 if merged.stats["failed"] else 0
+
+
+def _reply_stream():
+    # replies get the real stdout; everything else written to fd 1 from here on,
+    # including library warnings printed at import, goes to stderr
+    out = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    return out
+
+
+def cmd_worker(args):
+    out = None if args.socket else _reply_stream()
+    worker = _worker(args)
+    if not args.lazy:
+        worker.warm_up()
+    if args.socket:
+        worker.serve_unix(args.socket)
+    else:
+        worker.serve_stdio(out)
+
+
+def cmd_send(args):
+    from pipeline.worker import request
+
+    reply = request(args.socket, json.loads(args.request))
+    print(json.dumps(reply, indent=2, ensure_ascii=False))
+    return 0 if reply.get("ok") else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--metrics", help="enable instrumentation and write metrics here on exit "
+                                          "(.prom for Prometheus text, else JSON lines)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    model = argparse.ArgumentParser(add_help=False)
+    model.add_argument("--model", help="Hugging Face name or local directory of a Pegasus model "
+                                        "(default: google/pegasus-cnn_dailymail)")
+    model.add_argument("--device", default="cpu")
+    model.add_argument("--cache", help="ResultCache database file")
+    model.add_argument("--batch-size", type=int, default=8)
+    model.add_argument("--threads", type=int, help="torch intra-op threads")
+
+    p = commands.add_parser("paragraphs", help="print the body paragraphs of a PDF")
+    p.add_argument("pdf")
+    p.add_argument("--dedup-threshold", type=float, default=0.8)
+    p.set_defaults(func=cmd_paragraphs)
+
+    p = commands.add_parser("summarize", parents=[model], help="summarize every paragraph of a PDF")
+    p.add_argument("pdf")
+    p.add_argument("--reduce", action="store_true", help="also reduce to one overall summary")
+    p.add_argument("--dedup-threshold", type=float, default=0.8)
+    p.add_argument("--out")
+    p.set_defaults(func=cmd_summarize)
+
+    p = commands.add_parser("graph", parents=[model], help="extract and merge a knowledge graph")
+    p.add_argument("pdf")
+    p.add_argument("--max-tokens", type=int, default=1024)
+    p.add_argument("--max-in-flight", type=int, default=4)
+    p.add_argument("--out")
+    p.set_defaults(func=cmd_graph)
+
+    p = commands.add_parser("corpus", parents=[model], help="process a directory of PDFs on all cores")
+    p.add_argument("root", help="directory searched recursively for PDFs, or a single PDF")
+    p.add_argument("--workers", type=int, help="default: usable cores / --threads")
+    p.add_argument("--pin-cpus", action="store_true", help="bind every worker to its own cores")
+    p.add_argument("--reduce", action="store_true", help="also write one overall summary per document")
+    p.add_argument("--graph", action="store_true", help="extract knowledge graphs and merge them")
+    p.add_argument("--out", default="corpus.jsonl", help="per-document JSON lines; reruns skip finished documents")
+    p.add_argument("--graph-out", help="write the merged graph here as JSON")
+    p.set_defaults(func=cmd_corpus)
+
+    p = commands.add_parser("worker", parents=[model], help="serve jobs with the model kept loaded")
+    p.add_argument("--socket", help="listen on this Unix socket instead of stdin/stdout")
+    p.add_argument("--lazy", action="store_true", help="load the model on the first job")
+    p.set_defaults(func=cmd_worker)
+
+    p = commands.add_parser("send", help="send one JSON request to a running worker")
+    p.add_argument("--socket", required=True)
+    p.add_argument("request")
+    p.set_defaults(func=cmd_send)
+
+    args = parser.parse_args(argv)
+    if args.metrics:
+        instrumentation.enable()
+    try:
+        return args.func(args) or 0
+    finally:
+        if args.metrics:
+            if args.metrics.endswith(".prom"):
+                with open(args.metrics, "w") as f:
+                    f.write(instrumentation.prometheus_text())
+            else:
+                instrumentation.write_jsonl(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
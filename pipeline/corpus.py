@@ -0,0 +1,332 @@
+"""Process a directory of PDFs on every core, with one copy of the model.
+
+The parent loads Pegasus once and starts the pool with ``fork``, so every
+worker maps the same weight pages copy-on-write. Inference never writes to
+them, so they stay shared. Where ``fork`` is unavailable the weights are
+moved to shared memory first and handed to ``spawn``ed workers instead.
+Each worker runs a whole document (paragraphs, summaries, graph) with its
+own pinned torch thread count. Results stream back in completion order to
+a single merging stage in the parent, along with the worker's metrics::
+
+    runner = CorpusRunner(workers=8, graph=True)
+    merged = runner.run(iter_pdfs("reports/"), output_path="corpus.jsonl")
+"""
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+
+from pipeline import instrumentation
+
+# per-process state of a pool worker, set by _init_worker
+_STATE = {}
+
+
+@dataclass
+class DocumentResult:
+    path: str
+    paragraphs: list = field(default_factory=list)  # (page, text) pairs
+    summaries: list = field(default_factory=list)
+    overall: str | None = None
+    graph_docs: list = field(default_factory=list)
+    seconds: float = 0.0
+    error: str | None = None
+    metrics: list = field(default_factory=list)  # the worker's instrumentation.snapshot()
+
+    def record(self) -> dict:
+        """JSON-friendly view without the graph documents, which go to the merger."""
+        return {
+            "path": self.path,
+            "paragraphs": [{"page": page, "text": text} for page, text in self.paragraphs],
+            "summaries": self.summaries,
+            "overall": self.overall,
+            "graph_documents": len(self.graph_docs),
+            "seconds": round(self.seconds, 3),
+            "error": self.error,
+        }
+
+
+def iter_pdfs(root):
+    """All PDFs under ``root``, in a stable order."""
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, name)
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(tokenizer, model, threads, pin_cpus, counter, cache_path, options, metrics):
+    import torch
+
+    if metrics:
+        instrumentation.start_worker()
+    # fork copies the parent's thread settings; each worker gets its own budget
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already fixed by the parent
+    if pin_cpus and hasattr(os, "sched_setaffinity"):
+        with counter.get_lock():
+            slot = counter.value
+            counter.value += 1
+        cpus = _available_cpus()
+        start = slot * threads % len(cpus)
+        os.sched_setaffinity(0, {cpus[(start + i) % len(cpus)] for i in range(threads)})
+
+    cache = None
+    if cache_path:
+        from pipeline.cache import ResultCache
+
+        # SQLite connections must not cross a fork, so every worker opens its own
+        cache = ResultCache(cache_path)
+    _STATE.update(tokenizer=tokenizer, model=model, cache=cache, options=options)
+
+
+def _extract_graph(chunks, cache, options):
+    from generation.knowledge_graph_llm import make_scheduler
+
+    async def collect():
+        return await make_scheduler(cache, **options).run(chunks)
+
+    return asyncio.run(collect())
+
+
+def _process_document(path) -> DocumentResult:
+    from text_preprocessing.dedup import NearDuplicateFilter
+    from text_preprocessing.text_preprocessing import (
+        iter_paragraphs, reduce_summaries, summarize_batch,
+    )
+
+    options = _STATE["options"]
+    tokenizer, model, cache = _STATE["tokenizer"], _STATE["model"], _STATE["cache"]
+    result = DocumentResult(path)
+    start = time.perf_counter()
+    try:
+        with instrumentation.span("corpus_document"):
+            threshold = options["dedup_threshold"]
+            dedup = NearDuplicateFilter(threshold) if threshold else None
+            # pool workers are daemonic and cannot start a parsing pool of their own
+            result.paragraphs = list(
+                iter_paragraphs(path, workers=1, dedup=dedup, with_pages=True)
+            )
+            texts = [text for _, text in result.paragraphs]
+            if options["summarize"] and texts:
+                result.summaries = summarize_batch(
+                    texts, tokenizer, model, batch_size=options["batch_size"], cache=cache
+                )
+                if options["reduce"]:
+                    result.overall = reduce_summaries(
+                        result.summaries, tokenizer, model,
+                        batch_size=options["batch_size"], cache=cache,
+                    )
+            if options["graph"] and texts:
+                from text_preprocessing.chunking import pack_chunks
+
+                chunks = list(pack_chunks(result.paragraphs, options["max_tokens"]))
+                result.graph_docs = _extract_graph(chunks, cache, options["graph_options"])
+    except Exception as exc:
+        result.error = repr(exc)
+    result.seconds = time.perf_counter() - start
+    if instrumentation.enabled():
+        # this document's share only; the parent adds it to its own registry
+        result.metrics = instrumentation.snapshot()
+        instrumentation.REGISTRY.reset()
+    return result
+
+
+def _load_graph_docs(path) -> dict:
+    """Graph documents per PDF saved by an earlier run, the last record of each winning."""
+    saved = {}
+    if not os.path.exists(path):
+        return saved
+    with open(path, "r+b") as f:
+        while True:
+            offset = f.tell()
+            try:
+                doc_path, graph_docs = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                # end of file, or a record cut short by a crash: later appends
+                # start here so they stay readable. Anything else, such as a
+                # class that moved in an upgrade, is raised with the file intact.
+                f.truncate(offset)
+                break
+            saved[doc_path] = graph_docs
+    return saved
+
+
+class CorpusRunner:
+    """Shard PDFs across a process pool that shares one loaded summarizer.
+
+    ``workers`` defaults to the usable cores divided by
+    ``threads_per_worker``. With ``pin_cpus`` every worker is also bound to
+    its own cores, so torch threads of different workers don't compete.
+    Pass ``tokenizer`` and ``model`` to use an already-loaded model;
+    otherwise ``load_summarizer(model_name)`` is called once here.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        threads_per_worker=1,
+        summarize=True,
+        reduce=True,
+        graph=False,
+        model_name=None,
+        tokenizer=None,
+        model=None,
+        cache_path=None,
+        batch_size=8,
+        dedup_threshold=0.8,
+        max_tokens=1024,
+        pin_cpus=False,
+        start_method=None,
+        **graph_options,
+    ):
+        self.threads_per_worker = threads_per_worker
+        self.workers = workers or max(1, len(_available_cpus()) // threads_per_worker)
+        self.pin_cpus = pin_cpus
+        self.cache_path = cache_path
+        self.start_method = start_method or (
+            "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        self.options = {
+            "summarize": summarize,
+            "reduce": reduce,
+            "graph": graph,
+            "batch_size": batch_size,
+            "dedup_threshold": dedup_threshold,
+            "max_tokens": max_tokens,
+            "graph_options": graph_options,
+        }
+        if summarize and (tokenizer is None or model is None):
+            from text_preprocessing.text_preprocessing import MODEL_NAME, load_summarizer
+
+            tokenizer, model = load_summarizer(model_name or MODEL_NAME)
+        self.tokenizer = tokenizer
+        self.model = model
+        self.stats = {"documents": 0, "failed": 0, "paragraphs": 0, "graph_documents": 0}
+
+    def _pool(self):
+        import torch.multiprocessing as mp
+
+        ctx = mp.get_context(self.start_method)
+        if self.model is not None and self.start_method != "fork":
+            # spawned workers receive handles to these pages instead of a pickled copy
+            self.model.share_memory()
+        # keep the children's garbage collector from writing to (and so copying)
+        # every page of objects inherited from the parent
+        gc.collect()
+        gc.freeze()
+        # forked workers must not inherit, and later rewrite, unwritten span events
+        instrumentation.flush()
+        try:
+            return ctx.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.tokenizer, self.model, self.threads_per_worker, self.pin_cpus,
+                    ctx.Value("i", 0), self.cache_path, self.options,
+                    instrumentation.enabled(),
+                ),
+            )
+        finally:
+            gc.unfreeze()
+
+    def iter_results(self, paths):
+        """Yield a ``DocumentResult`` per PDF as soon as its worker finishes it."""
+        with self._pool() as pool:
+            for result in pool.imap_unordered(_process_document, paths, chunksize=1):
+                instrumentation.merge(result.metrics)
+                self.stats["documents"] += 1
+                self.stats["paragraphs"] += len(result.paragraphs)
+                self.stats["graph_documents"] += len(result.graph_docs)
+                instrumentation.count("corpus_documents")
+                if result.error is not None:
+                    self.stats["failed"] += 1
+                    instrumentation.count("corpus_failed")
+                    print(f"Error processing {result.path}: {result.error}")
+                yield result
+
+    def run(self, paths, output_path=None, merger=None):
+        """Process every PDF, merging all graphs into one.
+
+        With ``output_path``, one JSON line per document (paragraphs and
+        summaries) is appended as results arrive; documents already in the
+        file are skipped, so an interrupted run picks up where it stopped.
+        With ``graph`` on, each document's graph documents are also appended
+        to ``<output_path>.graphs`` and a resumed run merges the saved ones
+        in, so the merged graph still covers every document.
+        """
+        from generation.graph_merge import GraphMerger
+
+        merger = merger or GraphMerger()
+        paths = list(paths)
+        done = set()
+        out = graphs = None
+        if output_path is not None:
+            if os.path.exists(output_path):
+                with open(output_path) as f:
+                    done = {json.loads(line)["path"] for line in f if line.strip()}
+            skip = done
+            if self.options["graph"]:
+                saved = _load_graph_docs(f"{output_path}.graphs")
+                # documents finished without a graph are run again for it
+                skip = done & saved.keys()
+                for path in paths:
+                    if path in skip:
+                        for doc in saved[path]:
+                            merger.add(doc)
+                graphs = open(f"{output_path}.graphs", "ab")
+            paths = [p for p in paths if p not in skip]
+            out = open(output_path, "a")
+
+        start = time.perf_counter()
+        try:
+            for result in self.iter_results(paths):
+                for doc in result.graph_docs:
+                    merger.add(doc)
+                if out is None or result.error is not None:
+                    continue
+                if graphs is not None:
+                    # before the JSON line, so a document counted as done has its graph saved
+                    pickle.dump((result.path, result.graph_docs), graphs, protocol=pickle.HIGHEST_PROTOCOL)
+                    graphs.flush()
+                if result.path not in done:
+                    out.write(json.dumps(result.record(), ensure_ascii=False) + "\n")
+                    out.flush()
+        finally:
+            for f in (out, graphs):
+                if f is not None:
+                    f.close()
+
+        merged = merger.result()
+        merged.stats = {
+            **self.stats,
+            "workers": self.workers,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return merged
+
+
+def run_corpus(root, output_path=None, **options):
+    return CorpusRunner(**options).run(iter_pdfs(root), output_path)
+
+
+if __name__ == "__main__":
+    merged = run_corpus(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "corpus.jsonl")
+    print(merged.stats)
@@ -0,0 +1,320 @@
+"""Spans, counters and gauges for the pipeline stages.
+
+Disabled by default; every entry point then returns after one attribute
+check. Turn it on with ``enable()`` or ``PIPELINE_METRICS=1``::
+
+    from pipeline import instrumentation
+
+    instrumentation.enable(events_path="spans.jsonl")
+    instrumentation.profile_stage("summarize", mode="cprofile")
+    ...
+    print(instrumentation.prometheus_text())
+"""
+import cProfile
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+class _Noop:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Profiler:
+    # one capture per stage; nested or concurrent spans of the stage share it
+    def __init__(self, stage, mode, output):
+        if mode not in ("cprofile", "tracemalloc"):
+            raise ValueError(f"unknown profile mode {mode!r}")
+        self.stage = stage
+        self.mode = mode
+        self.output = output
+        self._depth = 0
+        self._profile = cProfile.Profile() if mode == "cprofile" else None
+        self.peak_bytes = 0
+
+    def start(self):
+        self._depth += 1
+        if self._depth > 1:
+            return
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.output)
+            return
+        snapshot = tracemalloc.take_snapshot()
+        self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        with open(self.output, "w") as f:
+            f.write(f"# {self.stage}: peak traced memory {self.peak_bytes} bytes\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> total
+        self.gauges = {}  # (name, labels) -> last value
+        self.spans = {}  # (name, labels) -> [count, sum, max, *bucket counts]
+        self.profiles = {}  # stage -> _Profiler
+        self._events = None
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.spans.clear()
+
+    def observe(self, name, labels, seconds):
+        key = (name, labels)
+        with self._lock:
+            stats = self.spans.get(key)
+            if stats is None:
+                stats = self.spans[key] = [0, 0.0, 0.0] + [0] * len(BUCKETS)
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats[3 + i] += 1
+                    break
+            if self._events is not None:
+                self._events.write(json.dumps({
+                    "ts": time.time(), "span": name, "seconds": seconds, **dict(labels)
+                }) + "\n")
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ("name", "labels", "_start", "_profiler")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self._profiler = REGISTRY.profiles.get(name)
+
+    def __enter__(self):
+        if self._profiler is not None:
+            self._profiler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, self.labels, time.perf_counter() - self._start)
+        if self._profiler is not None:
+            self._profiler.stop()
+        return False
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def enabled() -> bool:
+    """For call sites that would do extra work just to produce a metric."""
+    return REGISTRY.enabled
+
+
+def span(name: str, **labels):
+    """Context manager timing one occurrence of ``name``."""
+    if not REGISTRY.enabled:
+        return _NOOP
+    return _Span(name, _labels(labels))
+
+
+def count(name: str, value=1, **labels):
+    if not REGISTRY.enabled:
+        return
+    key = (name, _labels(labels))
+    with REGISTRY._lock:
+        REGISTRY.counters[key] = REGISTRY.counters.get(key, 0) + value
+
+
+def gauge(name: str, value, **labels):
+    """Record the latest value of ``name``, e.g. a queue depth."""
+    if not REGISTRY.enabled:
+        return
+    REGISTRY.gauges[(name, _labels(labels))] = value
+
+
+def timed(name: str):
+    """Decorator version of ``span`` for plain and async functions."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(events_path=None):
+    """Start collecting; with ``events_path`` every finished span is also appended there as JSON."""
+    if events_path is not None:
+        REGISTRY._events = open(events_path, "a", buffering=1 << 16)
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+    if REGISTRY._events is not None:
+        REGISTRY._events.close()
+        REGISTRY._events = None
+
+
+def profile_stage(stage: str, mode="cprofile", output=None):
+    """Capture cProfile stats or tracemalloc top allocations while ``stage`` spans run."""
+    suffix = "prof" if mode == "cprofile" else "tracemalloc.txt"
+    REGISTRY.profiles[stage] = _Profiler(stage, mode, output or f"{stage}.{suffix}")
+
+
+def snapshot() -> list[dict]:
+    """All metrics as plain dicts, one per metric and label set."""
+    with REGISTRY._lock:
+        out = [
+            {"type": "counter", "name": n, "labels": dict(l), "value": v}
+            for (n, l), v in REGISTRY.counters.items()
+        ]
+        out += [
+            {"type": "gauge", "name": n, "labels": dict(l), "value": v}
+            for (n, l), v in REGISTRY.gauges.items()
+        ]
+        out += [
+            {"type": "span", "name": n, "labels": dict(l), "count": s[0],
+             "sum_seconds": s[1], "max_seconds": s[2], "buckets": s[3:]}
+            for (n, l), s in REGISTRY.spans.items()
+        ]
+    return out
+
+
+def merge(metrics):
+    """Fold a ``snapshot()`` taken in another process into this registry."""
+    if not REGISTRY.enabled:
+        return
+    with REGISTRY._lock:
+        for m in metrics:
+            key = (m["name"], _labels(m["labels"]))
+            if m["type"] == "counter":
+                REGISTRY.counters[key] = REGISTRY.counters.get(key, 0) + m["value"]
+            elif m["type"] == "gauge":
+                REGISTRY.gauges[key] = m["value"]
+            else:
+                stats = REGISTRY.spans.get(key)
+                if stats is None:
+                    stats = REGISTRY.spans[key] = [0, 0.0, 0.0] + [0] * len(BUCKETS)
+                stats[0] += m["count"]
+                stats[1] += m["sum_seconds"]
+                stats[2] = max(stats[2], m["max_seconds"])
+                for i, n in enumerate(m["buckets"]):
+                    stats[3 + i] += n
+
+
+def flush():
+    """Write out buffered span events, e.g. before forking workers."""
+    if REGISTRY._events is not None:
+        REGISTRY._events.flush()
+
+
+def start_worker():
+    """Collect afresh in a worker process; the parent folds in its ``snapshot()``s.
+
+    Whatever the registry held at fork time belongs to the parent, and so do
+    the span event file and stage profiles.
+    """
+    REGISTRY.reset()
+    REGISTRY._events = None
+    REGISTRY.profiles = {}
+    REGISTRY.enabled = True
+
+
+def write_jsonl(path):
+    with open(path, "a") as f:
+        ts = time.time()
+        for metric in snapshot():
+            f.write(json.dumps({"ts": ts, **metric}) + "\n")
+
+
+def _metric_name(name):
+    return "pipeline_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_value(value):
+    # the text format's escapes for label values: backslash, quote, newline
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_prom_value(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def prometheus_text() -> str:
+    """Metrics in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+
+    def declare(metric, kind):
+        # one TYPE line per metric, however many label sets it has
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} {kind}")
+
+    with REGISTRY._lock:
+        for (name, labels), value in sorted(REGISTRY.counters.items()):
+            metric = _metric_name(name) + "_total"
+            declare(metric, "counter")
+            lines.append(f"{metric}{_prom_labels(labels)} {value}")
+        for (name, labels), value in sorted(REGISTRY.gauges.items()):
+            metric = _metric_name(name)
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prom_labels(labels)} {value}")
+        for (name, labels), stats in sorted(REGISTRY.spans.items()):
+            metric = _metric_name(name) + "_seconds"
+            declare(metric, "histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS, stats[3:]):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{_prom_labels(labels, le=le)} {cumulative}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {stats[1]}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {stats[0]}")
+    return "\n".join(lines) + "\n"
+
+
+if os.environ.get("PIPELINE_METRICS"):
+    enable(os.environ.get("PIPELINE_METRICS_EVENTS") or None)
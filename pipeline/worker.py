@@ -0,0 +1,201 @@
+"""Long-lived worker that keeps the summarizer warm between jobs.
+
+Requests and replies are single JSON lines, over stdin/stdout or a Unix
+socket::
+
+    {"id": 1, "op": "summarize", "texts": ["..."], "reduce": true}
+    {"id": 2, "op": "summarize", "pdf": "report.pdf"}
+    {"id": 3, "op": "paragraphs", "pdf": "report.pdf"}
+    {"id": 4, "op": "graph", "pdf": "report.pdf"}
+    {"id": 5, "op": "metrics"}
+
+    {"id": 1, "ok": true, "result": ...}
+    {"id": 1, "ok": false, "error": "..."}
+
+Jobs run one at a time, so the model is never used by two threads at once.
+"""
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from pipeline import instrumentation
+
+
+def graph_json(merged) -> dict:
+    return {
+        "nodes": [{"id": n.id, "type": n.type} for n in merged.nodes],
+        "relationships": [
+            {"source": r.source.id, "target": r.target.id, "type": r.type}
+            for r in merged.relationships
+        ],
+        "stats": merged.stats,
+    }
+
+
+class Worker:
+    def __init__(self, model_name=None, device="cpu", cache=None, batch_size=8,
+                 num_threads=None):
+        self.model_name = model_name
+        self.device = device
+        self.cache = cache
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.jobs = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def summarizer(self):
+        from text_preprocessing.text_preprocessing import MODEL_NAME, load_summarizer
+
+        return load_summarizer(self.model_name or MODEL_NAME, self.device)
+
+    def warm_up(self):
+        if self.num_threads:
+            import torch
+
+            torch.set_num_threads(self.num_threads)
+        self.summarizer()
+
+    def _paragraphs(self, request):
+        from text_preprocessing.dedup import NearDuplicateFilter
+        from text_preprocessing.text_preprocessing import extract_paragraphs
+
+        threshold = request.get("dedup_threshold", 0.8)
+        dedup = NearDuplicateFilter(threshold) if threshold else None
+        return extract_paragraphs(
+            request["pdf"], min_length=request.get("min_length", 300), dedup=dedup
+        )
+
+    def _summarize(self, request):
+        from text_preprocessing.text_preprocessing import reduce_summaries, summarize_batch
+
+        texts = request["texts"] if "texts" in request else self._paragraphs(request)
+        tokenizer, model = self.summarizer()
+        summaries = summarize_batch(
+            texts, tokenizer, model, batch_size=self.batch_size, cache=self.cache
+        )
+        if not request.get("reduce"):
+            return summaries
+        overall = reduce_summaries(
+            summaries, tokenizer, model, batch_size=self.batch_size, cache=self.cache
+        )
+        return {"summaries": summaries, "overall": overall}
+
+    def _graph(self, request):
+        from generation.knowledge_graph_llm import build_and_merge, build_from_pdf
+
+        options = request.get("options", {})
+        if "texts" in request:
+            merged = build_and_merge(request["texts"], self.cache, **options)
+        else:
+            merged = build_from_pdf(
+                request["pdf"], request.get("max_tokens", 1024), cache=self.cache, **options
+            )
+        return graph_json(merged)
+
+    def handle(self, request: dict) -> dict:
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "bad request: expected a JSON object"}
+        reply = {"id": request.get("id")}
+        op = request.get("op")
+        handlers = {
+            "paragraphs": self._paragraphs,
+            "summarize": self._summarize,
+            "graph": self._graph,
+            "metrics": lambda _: instrumentation.prometheus_text(),
+            "ping": lambda _: {"jobs": self.jobs, "model": self.model_name},
+        }
+        if op == "shutdown":
+            if self._server is not None:
+                threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {**reply, "ok": True, "result": None}
+        if op not in handlers:
+            return {**reply, "ok": False, "error": f"unknown op {op!r}"}
+        try:
+            with self._lock, instrumentation.span("worker_job", op=op):
+                result = handlers[op](request)
+                self.jobs += 1
+        except Exception as exc:
+            return {**reply, "ok": False, "error": repr(exc)}
+        return {**reply, "ok": True, "result": result}
+
+    def serve_stream(self, rfile, wfile):
+        """Answer JSON-line requests from ``rfile`` until it is closed."""
+        for line in rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                request = {}
+                reply = {"id": None, "ok": False, "error": f"bad request: {exc}"}
+            else:
+                reply = self.handle(request)
+            wfile.write(json.dumps(reply) + "\n")
+            wfile.flush()
+            if isinstance(request, dict) and request.get("op") == "shutdown":
+                break
+
+    def serve_stdio(self, out=None):
+        out = out or sys.stdout
+        # progress prints from the pipeline must not end up between replies
+        with contextlib.redirect_stdout(sys.stderr):
+            self.serve_stream(sys.stdin, out)
+
+    def serve_unix(self, path):
+        worker = self
+        _remove_stale_socket(path)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                rfile = (line.decode() for line in self.rfile)
+                wfile = _TextWriter(self.wfile)
+                worker.serve_stream(rfile, wfile)
+
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            self._server = server
+            print(f"worker listening on {path}", file=sys.stderr)
+            try:
+                server.serve_forever()
+            finally:
+                self._server = None
+                os.unlink(path)
+
+
+def _remove_stale_socket(path):
+    # a socket file left behind by a worker that died; refuse to steal a live one
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise RuntimeError(f"a worker is already listening on {path}")
+
+
+class _TextWriter:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, text):
+        self.raw.write(text.encode())
+
+    def flush(self):
+        self.raw.flush()
+
+
+def request(socket_path, payload: dict) -> dict:
+    """Send one request to a worker listening on ``socket_path`` and wait for the reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as f:
+            f.write((json.dumps(payload) + "\n").encode())
+            f.flush()
+            return json.loads(f.readline())
@@ -0,0 +1,109 @@
+import itertools
+import pickle
+import sqlite3
+import types
+
+import pytest
+
+from pipeline import cache as cache_module
+from pipeline.cache import ResultCache
+
+
+def _size(value):
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _sum_sizes(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # strictly increasing access times, so LRU order never depends on clock resolution
+    ticks = itertools.count(1)
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_byte_total_follows_inserts_replaces_and_evictions(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with ResultCache(path, max_bytes=10_000) as cache:
+        for i in range(20):
+            cache.set(f"k{i}", b"x" * (100 * i))
+            assert cache.stats()["bytes"] == _sum_sizes(path)
+        # REPLACE deletes the old row: the total must not count both versions
+        before = cache.stats()["bytes"]
+        cache.set("k19", b"y" * 5)
+        assert cache.stats()["bytes"] == before - _size(b"x" * 1900) + _size(b"y" * 5)
+        assert cache.stats()["bytes"] == _sum_sizes(path)
+        assert cache.stats()["bytes"] <= 10_000
+        assert cache.evictions > 0
+
+
+def test_total_is_seeded_from_an_existing_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with sqlite3.connect(path) as conn:
+        # a cache file written before the byte total existed
+        conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                     " size INTEGER NOT NULL, accessed REAL NOT NULL)")
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)",
+                         [(f"k{i}", b"v", 100 + i, 0.0) for i in range(5)])
+    with ResultCache(path) as cache:
+        assert cache.stats()["bytes"] == 510
+        cache.set("k5", "new")
+        assert cache.stats()["bytes"] == 510 + _size("new")
+    with ResultCache(path) as cache:
+        # reopening must not seed a second time
+        assert cache.stats()["bytes"] == 510 + _size("new")
+
+
+def test_eviction_sees_buffered_reads(tmp_path):
+    value = b"v" * 1000
+    with ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=3 * _size(value)) as cache:
+        for key in "abc":
+            cache.set(key, value)
+        assert cache.get("a") == value  # buffered, not yet written
+        cache.set("d", value)
+        assert cache.get("b") is None
+        assert all(cache.get(key) == value for key in "acd")
+        assert cache.evictions == 1
+
+
+def test_reads_are_flushed_in_batches_and_on_close(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+
+    def accessed(key):
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT accessed FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+    cache = ResultCache(path, touch_batch=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    written = accessed("a")
+    cache.get("a")
+    assert accessed("a") == written
+    cache.get("b")
+    assert accessed("a") > written
+    cache.get("a")
+    before_close = accessed("a")
+    cache.close()
+    assert accessed("a") > before_close
+
+
+def test_hit_and_miss_counters(tmp_path):
+    with ResultCache(str(tmp_path / "cache.sqlite")) as cache:
+        assert cache.get("missing") is None
+        assert cache.get("missing", "default") == "default"
+        cache.set("k", {"summary": "text"})
+        assert cache.get("k") == {"summary": "text"}
+        assert cache.stats() == {
+            "hits": 1, "misses": 2, "evictions": 0, "entries": 1, "bytes": _size({"summary": "text"}),
+        }
+
+
+def test_keys_change_with_any_input():
+    key = ResultCache.make_key("text", "model", beams=4)
+    assert key == ResultCache.make_key("text", "model", beams=4)
+    assert len({key, ResultCache.make_key("text!", "model", beams=4),
+                ResultCache.make_key("text", "other", beams=4),
+                ResultCache.make_key("text", "model", beams=5)}) == 4
@@ -0,0 +1,57 @@
+import pytest
+
+from text_preprocessing.chunking import approx_token_count, pack_chunks
+
+
+def _words(n, tag):
+    # n words of 4 characters plus a space: about n + n // 4 tokens
+    return " ".join(f"{tag}{i % 100:03d}"[-4:] for i in range(n))
+
+
+def test_chunks_stay_within_budget_and_keep_order():
+    paragraphs = [_words(10 + 5 * i, chr(97 + i)) for i in range(10)]
+    chunks = list(pack_chunks(paragraphs, max_tokens=100))
+
+    assert len(chunks) > 1
+    assert all(c.tokens <= 100 for c in chunks)
+    assert all(approx_token_count(c.text) <= 100 for c in chunks)
+    assert [p for c in chunks for p in c.paragraphs] == list(range(10))
+    assert "\n\n".join(c.text for c in chunks) == "\n\n".join(paragraphs)
+
+
+def test_overlap_repeats_the_tail_of_the_previous_chunk():
+    paragraphs = [_words(20, chr(97 + i)) for i in range(8)]
+    chunks = list(pack_chunks(paragraphs, max_tokens=80, overlap_tokens=40))
+
+    assert all(c.tokens <= 80 for c in chunks)
+    for prev, chunk in zip(chunks, chunks[1:]):
+        assert chunk.paragraphs[0] == prev.paragraphs[-1]
+        assert chunk.text.startswith(paragraphs[prev.paragraphs[-1]])
+    assert sorted({p for c in chunks for p in c.paragraphs}) == list(range(8))
+
+    with pytest.raises(ValueError):
+        list(pack_chunks(paragraphs, max_tokens=80, overlap_tokens=80))
+
+
+def test_oversized_paragraphs_are_split_on_sentences_then_words():
+    sentences = " ".join(f"Sentence number {i} says something short." for i in range(40))
+    run_on = _words(300, "w")
+    blob = "x" * 2000
+    chunks = list(pack_chunks([sentences, run_on, blob], max_tokens=50))
+
+    assert all(c.tokens <= 50 for c in chunks)
+    from_sentences = [c for c in chunks if c.paragraphs == [0]]
+    assert len(from_sentences) > 1
+    assert all(c.text.endswith(".") for c in from_sentences)
+    assert " ".join(c.text for c in chunks if c.paragraphs == [1]) == run_on
+    assert "".join(c.text for c in chunks if c.paragraphs == [2]) == blob
+
+
+def test_chunks_record_pages_and_paragraphs():
+    paragraphs = [(1, _words(30, "a")), (1, _words(30, "b")), (2, _words(30, "c")), (4, _words(30, "d"))]
+    chunks = list(pack_chunks(paragraphs, max_tokens=80))
+
+    assert [c.metadata for c in chunks] == [
+        {"paragraphs": [0, 1], "pages": [1]},
+        {"paragraphs": [2, 3], "pages": [2, 4]},
+    ]
@@ -0,0 +1,113 @@
+import json
+import os
+import pickle
+import sys
+
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from benchmarks.fixtures import make_pdf
+from pipeline import corpus, instrumentation
+
+
+def _fake_graph(chunks, cache, options):
+    # one relationship per chunk, named after the first words of the chunk
+    docs = []
+    for chunk in chunks:
+        head, tail = chunk.text.split()[:2]
+        source, target = Node(id=head, type="Word"), Node(id=f"{head} {tail}", type="Phrase")
+        docs.append(GraphDocument(
+            nodes=[source, target],
+            relationships=[Relationship(source=source, target=target, type="STARTS")],
+            source=Document(page_content=chunk.text, metadata=chunk.metadata),
+        ))
+    return docs
+
+
+@pytest.fixture
+def pdfs(tmp_path, monkeypatch):
+    # pool workers are forked, so they see the patched extractor
+    monkeypatch.setattr(corpus, "_extract_graph", _fake_graph)
+    paths = []
+    for seed in range(3):
+        path = str(tmp_path / f"report{seed}.pdf")
+        make_pdf(path, pages=2, seed=seed)
+        paths.append(path)
+    return paths
+
+
+def _runner():
+    return corpus.CorpusRunner(workers=1, summarize=False, graph=True, max_tokens=256,
+                               start_method="fork")
+
+
+def _edges(merged):
+    return sorted((r.source.id, r.type, r.target.id) for r in merged.relationships)
+
+
+def test_resumed_run_keeps_the_graphs_of_finished_documents(pdfs, tmp_path):
+    full = _runner().run(pdfs, str(tmp_path / "full.jsonl"))
+
+    output = str(tmp_path / "resumed.jsonl")
+    _runner().run(pdfs[:2], output)
+    runner = _runner()
+    resumed = runner.run(pdfs, output)
+
+    assert runner.stats["documents"] == 1
+    assert _edges(resumed) == _edges(full)
+    with open(output) as f:
+        assert sorted(json.loads(line)["path"] for line in f) == pdfs
+
+
+def test_finished_documents_without_a_saved_graph_are_rerun(pdfs, tmp_path):
+    output = str(tmp_path / "corpus.jsonl")
+    corpus.CorpusRunner(workers=1, summarize=False, start_method="fork").run(pdfs, output)
+    runner = _runner()
+    merged = runner.run(pdfs, output)
+
+    assert runner.stats["documents"] == len(pdfs)
+    assert merged.relationships
+    with open(output) as f:
+        assert len(f.readlines()) == len(pdfs)
+
+
+def test_worker_metrics_reach_the_parent(pdfs):
+    instrumentation.enable()
+    try:
+        corpus.CorpusRunner(workers=2, summarize=False, start_method="fork").run(pdfs)
+        spans = {m["name"]: m for m in instrumentation.snapshot() if m["type"] == "span"}
+    finally:
+        instrumentation.disable()
+        instrumentation.REGISTRY.reset()
+    assert spans["corpus_document"]["count"] == len(pdfs)
+    assert sum(spans["corpus_document"]["buckets"]) == len(pdfs)
+
+
+def test_only_a_cut_off_tail_of_saved_graphs_is_dropped(tmp_path):
+    path = str(tmp_path / "corpus.jsonl.graphs")
+    with open(path, "wb") as f:
+        pickle.dump(("a.pdf", [1]), f)
+        good = f.tell()
+        pickle.dump(("b.pdf", list(range(100))), f)
+    os.truncate(path, good + 20)
+
+    assert corpus._load_graph_docs(path) == {"a.pdf": [1]}
+    assert os.path.getsize(path) == good
+
+
+class _Moved:
+    # stands in for a class that an upgrade moved or renamed
+    pass
+
+
+def test_unloadable_saved_graphs_are_not_truncated(tmp_path, monkeypatch):
+    path = str(tmp_path / "corpus.jsonl.graphs")
+    with open(path, "wb") as f:
+        pickle.dump(("a.pdf", [_Moved()]), f)
+    size = os.path.getsize(path)
+    monkeypatch.delattr(sys.modules[__name__], "_Moved")
+
+    with pytest.raises(AttributeError):
+        corpus._load_graph_docs(path)
+    assert os.path.getsize(path) == size
@@ -0,0 +1,53 @@
+from benchmarks.fixtures import synthetic_paragraphs
+from text_preprocessing.dedup import NearDuplicateFilter
+
+TEXTS = synthetic_paragraphs(50, seed=5, duplicate_rate=0)
+
+
+def _edit(text, every):
+    # replace every ``every``-th word
+    words = text.split()
+    return " ".join("changed" if i % every == 0 else w for i, w in enumerate(words))
+
+
+def test_exact_and_near_duplicates():
+    dedup = NearDuplicateFilter(0.8)
+    assert not any(dedup.is_duplicate(t) for t in TEXTS)
+    assert dedup.is_duplicate(TEXTS[3])
+    assert dedup.is_duplicate("  " + TEXTS[7].upper() + " ")
+    assert dedup.is_duplicate(_edit(TEXTS[9], 40))
+    assert dedup.stats() == {"kept": len(TEXTS), "duplicates": 3}
+
+
+def test_threshold():
+    rewritten = _edit(TEXTS[0], 3)
+    strict, loose = NearDuplicateFilter(0.9), NearDuplicateFilter(0.2)
+    for dedup in (strict, loose):
+        dedup.add(TEXTS[0])
+    assert not strict.is_duplicate(rewritten)
+    assert loose.is_duplicate(rewritten)
+
+
+def test_add_remembers_without_counting():
+    dedup = NearDuplicateFilter()
+    dedup.add(TEXTS[0])
+    dedup.add(TEXTS[0])
+    assert dedup.duplicates == 0
+    assert dedup.is_duplicate(TEXTS[0])
+    assert dedup.duplicates == 1
+
+
+def test_filter_keeps_first_occurrences_in_order():
+    items = [(i, t) for i, t in enumerate(TEXTS[:10] + TEXTS[:5] + TEXTS[10:12])]
+    kept = list(NearDuplicateFilter().filter(items, batch_size=4, key=lambda item: item[1]))
+    assert [i for i, _ in kept] == list(range(10)) + [15, 16]
+
+
+def test_capacity_forgets_the_oldest_texts():
+    dedup = NearDuplicateFilter(capacity=10)
+    for t in TEXTS[:25]:
+        assert not dedup.is_duplicate(t)
+    assert len(dedup._signatures) == 10
+    assert sum(len(slots) for slots in dedup._buckets.values()) == 10 * dedup.bands
+    assert not dedup.is_duplicate(TEXTS[0])  # forgotten, and now remembered again
+    assert dedup.is_duplicate(TEXTS[24])
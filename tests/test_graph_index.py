@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from langchain_community.graphs.graph_document import Node, Relationship
+
+from generation.graph_index import GraphIndex
+from generation.graph_merge import MergedGraph
+
+# a -KNOWS-> b -KNOWS-> c -USES-> d, a -USES-> d, e isolated
+#         \-KNOWS-> x (a dead end for KNOWS then USES)
+NODES = {name: Node(id=name, type="Tool" if name == "d" else "Person") for name in "abcdex"}
+EDGES = [("a", "KNOWS", "b"), ("b", "KNOWS", "c"), ("c", "USES", "d"), ("a", "USES", "d"),
+         ("b", "KNOWS", "x")]
+
+
+@pytest.fixture(scope="module")
+def index():
+    rels = [Relationship(source=NODES[s], target=NODES[t], type=r) for s, r, t in EDGES]
+    return GraphIndex.from_graph(MergedGraph(list(NODES.values()), rels))
+
+
+def _id(index, name):
+    return index.names(range(index.num_nodes)).index(name)
+
+
+def _edges(index, src, types, dst):
+    return sorted(zip(index.names(src), (index.string(int(t)) for t in types), index.names(dst)))
+
+
+def test_from_graph(index):
+    assert index.num_nodes == 6 and index.num_edges == 5
+    assert index.names(range(6)) == list("abcdex")
+    assert index.string(int(index.node_types[_id(index, "d")])) == "Tool"
+    assert list(index.out_degree()) == [2, 2, 1, 0, 0, 0]
+    assert _edges(index, *index.edges_from(range(6))) == sorted(EDGES)
+    assert set(index.labels()) == {"Person", "Tool", "KNOWS", "USES"}
+
+
+def test_k_hop(index):
+    a, b, c, d = (_id(index, n) for n in "abcd")
+    assert index.names(index.k_hop([a], 0)) == ["a"]
+    hop1 = index.k_hop([a], 1)
+    assert hop1[0] == a and set(index.names(hop1)) == {"a", "b", "d"}
+    assert set(index.names(index.k_hop([a], 2))) == {"a", "b", "c", "d", "x"}
+    # incoming edges count unless directed
+    assert set(index.names(index.k_hop([d], 1))) == {"a", "c", "d"}
+    assert index.names(index.k_hop([d], 1, directed=True)) == ["d"]
+    assert len(index.k_hop([a], 2, max_nodes=2)) == 2
+    assert index.names(index.k_hop([_id(index, "e")], 3)) == ["e"]
+
+
+def test_subgraph_edges(index):
+    nodes = [_id(index, n) for n in "abd"]
+    assert _edges(index, *index.subgraph_edges(nodes)) == [("a", "KNOWS", "b"), ("a", "USES", "d")]
+
+
+def test_random_walks_follow_edges(index):
+    rng = np.random.default_rng(0)
+    starts = np.repeat(np.arange(index.num_nodes), 20)
+    walks = index.random_walks(starts, 3, rng)
+    assert walks.shape == (len(starts), 4)
+    edges = {(_id(index, s), _id(index, t)) for s, _, t in EDGES}
+    for walk in walks:
+        steps = walk[walk >= 0]
+        assert (walk[len(steps):] == -1).all()
+        assert all((int(u), int(v)) in edges for u, v in zip(steps, steps[1:]))
+    # a is visited often enough to take both of its edges
+    assert {int(w[1]) for w in walks[starts == _id(index, "a")]} == {_id(index, "b"), _id(index, "d")}
+
+
+def test_typed_paths_returns_n_rows(index):
+    rng = np.random.default_rng(1)
+    paths = index.typed_paths(["KNOWS", "KNOWS", "USES"], 50, rng)
+    # half the walkers die at x; the rest are resampled
+    assert paths.shape == (50, 4)
+    assert {tuple(index.names(p)) for p in paths} == {("a", "b", "c", "d")}
+    assert index.typed_paths(["USES", "KNOWS"], 10, rng).shape == (0, 3)
+    with pytest.raises(KeyError):
+        index.typed_paths(["MISSING"], 10, rng)
+
+
+def test_save_and_load_memory_maps(index, tmp_path):
+    index.save(str(tmp_path / "index"))
+    loaded = GraphIndex.load(str(tmp_path / "index"))
+    assert isinstance(loaded.targets, np.memmap)
+    assert not loaded.targets.flags.writeable
+    assert loaded.names(range(loaded.num_nodes)) == index.names(range(index.num_nodes))
+    for name in ("offsets", "targets", "edge_types", "rev_offsets", "rev_targets", "node_types"):
+        assert np.array_equal(getattr(loaded, name), getattr(index, name))
+    assert sorted(loaded.k_hop([0], 2).tolist()) == sorted(index.k_hop([0], 2).tolist())
+
+    with open(tmp_path / "index" / "index.json", "w") as f:
+        f.write('{"format": 99, "num_nodes": 6}')
+    with pytest.raises(ValueError):
+        GraphIndex.load(str(tmp_path / "index"))
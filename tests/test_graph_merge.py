@@ -0,0 +1,80 @@
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from generation.graph_merge import GraphMerger, normalize_name
+
+
+def _doc(*names):
+    nodes = [Node(id=name, type="Concept") for name in names]
+    rels = [Relationship(source=a, target=b, type="RELATED") for a, b in zip(nodes, nodes[1:])]
+    return GraphDocument(nodes=nodes, relationships=rels, source=Document(page_content=""))
+
+
+def _groups(*docs):
+    merger = GraphMerger()
+    for doc in docs:
+        merger.add(doc)
+    merged = merger.result()
+    return {normalize_name(n.id) for n in merged.nodes}, merger
+
+
+def test_words_that_only_look_plural_are_kept():
+    assert normalize_name("News") == "news"
+    assert normalize_name("Time Series") == "time series"
+    assert normalize_name("Physics") == "physics"
+    assert normalize_name("Movies") == "movie"
+    assert normalize_name("Universities") == "university"
+    assert normalize_name("Students") == "student"
+    nodes, _ = _groups(_doc("News", "New"))
+    assert len(nodes) == 2
+
+
+def test_acronyms_keep_their_plural_s():
+    assert normalize_name("HTTPS") == "https"
+    assert normalize_name("LLMs") == "llm"
+    nodes, _ = _groups(_doc("HTTPS", "HTTP"))
+    assert len(nodes) == 2
+
+
+def test_aliases_of_one_entity_merge():
+    nodes, _ = _groups(
+        _doc("LMS", "Students"),
+        _doc("Learning Management Systems (LMS)", "lms"),
+        _doc("Learning Management System", "Student"),
+    )
+    assert nodes == {"lms", "student"}
+
+
+def test_ambiguous_acronym_stays_apart():
+    nodes, _ = _groups(_doc("Artificial Intelligence", "AI"), _doc("Adobe Illustrator", "AI"))
+    assert nodes == {"artificial intelligence", "ai", "adobe illustrator"}
+
+
+def test_explicit_pairing_wins_over_other_long_forms():
+    nodes, _ = _groups(
+        _doc("Adobe Illustrator", "AI"),
+        _doc("Artificial Intelligence (AI)"),
+        _doc("Academic Integrity (AI)"),
+    )
+    # the second spelled-out form keeps its own node, named as written
+    assert nodes == {"adobe illustrator", "ai", "academic integrity ai"}
+
+
+def test_snapshots_do_not_change_later_merges():
+    merger = GraphMerger()
+    merger.add(_doc("Adobe Illustrator", "AI"))
+    early = merger.result()
+    assert [(r.source.id, r.target.id) for r in early.relationships] == [
+        ("Adobe Illustrator", "Adobe Illustrator")
+    ]
+    merger.add(_doc("Artificial Intelligence (AI)"))
+    late = merger.result()
+    assert {n.id for n in late.nodes} == {"Adobe Illustrator", "AI"}
+    assert [(r.source.id, r.target.id) for r in late.relationships] == [("Adobe Illustrator", "AI")]
+
+
+def test_unambiguous_acronym_merges_in_either_order():
+    for docs in ([_doc("AI"), _doc("Artificial Intelligence")],
+                 [_doc("Artificial Intelligence"), _doc("AI")]):
+        nodes, _ = _groups(*docs)
+        assert len(nodes) == 1
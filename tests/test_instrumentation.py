@@ -0,0 +1,143 @@
+import asyncio
+import json
+import pstats
+
+import pytest
+
+from pipeline import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    yield instrumentation.REGISTRY
+    instrumentation.disable()
+    instrumentation.REGISTRY.reset()
+    instrumentation.REGISTRY.profiles = {}
+
+
+def _metrics():
+    return {(m["type"], m["name"], tuple(sorted(m["labels"].items()))): m
+            for m in instrumentation.snapshot()}
+
+
+def test_disabled_calls_record_nothing(registry):
+    assert not instrumentation.enabled()
+    with instrumentation.span("stage") as s:
+        pass
+    assert s is instrumentation._NOOP
+    instrumentation.count("items", 5)
+    instrumentation.gauge("depth", 3)
+    assert instrumentation.snapshot() == []
+
+
+def test_counters_gauges_and_spans_aggregate():
+    instrumentation.enable()
+    instrumentation.count("items")
+    instrumentation.count("items", 4)
+    instrumentation.count("items", 2, stage="b")
+    instrumentation.gauge("depth", 3)
+    instrumentation.gauge("depth", 1)
+    for seconds in (0.002, 0.02, 2.0):
+        instrumentation.REGISTRY.observe("stage", (), seconds)
+
+    metrics = _metrics()
+    assert metrics[("counter", "items", ())]["value"] == 5
+    assert metrics[("counter", "items", (("stage", "b"),))]["value"] == 2
+    assert metrics[("gauge", "depth", ())]["value"] == 1
+    span = metrics[("span", "stage", ())]
+    assert span["count"] == 3
+    assert span["sum_seconds"] == pytest.approx(2.022)
+    assert span["max_seconds"] == 2.0
+    buckets = dict(zip(instrumentation.BUCKETS, span["buckets"]))
+    assert (buckets[0.005], buckets[0.05], buckets[5.0], sum(span["buckets"])) == (1, 1, 1, 3)
+
+
+def test_timed_covers_plain_and_async_functions():
+    instrumentation.enable()
+
+    @instrumentation.timed("plain")
+    def plain(x):
+        return x + 1
+
+    @instrumentation.timed("coro")
+    async def coro(x):
+        return x * 2
+
+    assert plain(1) == 2
+    assert asyncio.run(coro(2)) == 4
+    with pytest.raises(ZeroDivisionError):
+        with instrumentation.span("failing", op="div"):
+            1 / 0
+    metrics = _metrics()
+    assert metrics[("span", "plain", ())]["count"] == 1
+    assert metrics[("span", "coro", ())]["count"] == 1
+    assert metrics[("span", "failing", (("op", "div"),))]["count"] == 1
+
+
+def test_prometheus_text():
+    instrumentation.enable()
+    instrumentation.count("jobs done", 2, op="sum")
+    instrumentation.count("jobs done", 1, op="max")
+    instrumentation.gauge("depth", 7, path='C:\\tmp\\"x"\nnext')
+    instrumentation.REGISTRY.observe("stage", (), 0.02)
+
+    lines = instrumentation.prometheus_text().splitlines()
+    assert lines.count("# TYPE pipeline_jobs_done_total counter") == 1
+    assert 'pipeline_jobs_done_total{op="sum"} 2' in lines
+    assert 'pipeline_depth{path="C:\\\\tmp\\\\\\"x\\"\\nnext"} 7' in lines
+    assert "# TYPE pipeline_stage_seconds histogram" in lines
+    assert 'pipeline_stage_seconds_bucket{le="0.01"} 0' in lines
+    assert 'pipeline_stage_seconds_bucket{le="0.05"} 1' in lines
+    assert 'pipeline_stage_seconds_bucket{le="+Inf"} 1' in lines
+    assert "pipeline_stage_seconds_count 1" in lines
+
+
+def test_merge_adds_another_processes_snapshot():
+    instrumentation.enable()
+    instrumentation.count("items", 2)
+    instrumentation.REGISTRY.observe("stage", (), 0.02)
+    other = instrumentation.snapshot()
+    instrumentation.merge(other)
+    metrics = _metrics()
+    assert metrics[("counter", "items", ())]["value"] == 4
+    assert metrics[("span", "stage", ())]["count"] == 2
+    assert sum(metrics[("span", "stage", ())]["buckets"]) == 2
+
+
+def test_write_jsonl_and_events(tmp_path):
+    events = tmp_path / "events.jsonl"
+    instrumentation.enable(events_path=str(events))
+    with instrumentation.span("stage", doc="a"):
+        pass
+    instrumentation.write_jsonl(str(tmp_path / "metrics.jsonl"))
+    instrumentation.disable()
+
+    [event] = [json.loads(line) for line in events.open()]
+    assert (event["span"], event["doc"]) == ("stage", "a")
+    [metric] = [json.loads(line) for line in (tmp_path / "metrics.jsonl").open()]
+    assert (metric["type"], metric["name"], metric["count"]) == ("span", "stage", 1)
+
+
+def test_profile_stage(tmp_path):
+    instrumentation.enable()
+    cprofile = str(tmp_path / "stage.prof")
+    traced = str(tmp_path / "other.txt")
+    instrumentation.profile_stage("stage", output=cprofile)
+    instrumentation.profile_stage("other", mode="tracemalloc", output=traced)
+
+    def work():
+        return sorted(str(i) for i in range(10_000))
+
+    with instrumentation.span("stage"):
+        with instrumentation.span("stage"):  # nested spans share one capture
+            work()
+    with instrumentation.span("other"):
+        kept = work()
+
+    stats = pstats.Stats(cprofile)
+    assert any(name == "work" for _, _, name in stats.stats)
+    with open(traced) as f:
+        assert f.readline().startswith("# other: peak traced memory")
+    assert kept
+    with pytest.raises(ValueError):
+        instrumentation.profile_stage("x", mode="perf")
@@ -0,0 +1,29 @@
+from benchmarks.fixtures import fake_graph_transformer, make_pdf
+from generation import knowledge_graph_llm
+from text_preprocessing.text_preprocessing import extract_paragraphs
+
+
+class _Recording:
+    def __init__(self, inner):
+        self.inner = inner
+        self.texts = []
+
+    async def aconvert_to_graph_documents(self, docs):
+        self.texts += [d.page_content for d in docs]
+        return await self.inner.aconvert_to_graph_documents(docs)
+
+
+def test_repeated_paragraphs_are_not_sent_to_the_llm(tmp_path, monkeypatch):
+    pdf = str(tmp_path / "report.pdf")
+    make_pdf(pdf, pages=10, seed=3, duplicate_rate=0.4)
+    paragraphs = extract_paragraphs(pdf)
+    assert len(set(paragraphs)) < len(paragraphs)
+
+    transformer = _Recording(fake_graph_transformer(latency=0.001, jitter=0, entities=50))
+    monkeypatch.setattr(knowledge_graph_llm, "get_graph_transformer", lambda: transformer)
+    merged = knowledge_graph_llm.build_from_pdf(pdf, max_tokens=256)
+
+    sent = [p for text in transformer.texts for p in text.split("\n\n")]
+    assert merged.nodes
+    assert sorted(set(sent)) == sorted(set(paragraphs))
+    assert len(sent) == len(set(sent))
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from benchmarks.fake_llm import FakeQueryLLM
+from generation.graph_index import GraphIndex
+from generation.graph_merge import GraphMerger
+from generation.queries_generation import CheckpointedJsonlWriter, agenerate_user_queries
+
+PARAGRAPHS = [
+    "Students use the LMS to submit assignments and check grades.",
+    "Professors grade assignments in Gradescope and post feedback.",
+]
+
+
+def _index():
+    students, lms = Node(id="Students", type="Person"), Node(id="LMS", type="System")
+    professors, grading = Node(id="Professors", type="Person"), Node(id="Grading", type="Task")
+    doc = GraphDocument(
+        nodes=[students, lms, professors, grading],
+        relationships=[
+            Relationship(source=students, target=lms, type="USE"),
+            Relationship(source=professors, target=grading, type="DO"),
+        ],
+        source=Document(page_content=" ".join(PARAGRAPHS)),
+    )
+    merger = GraphMerger()
+    merger.add(doc)
+    return GraphIndex.from_graph(merger.result())
+
+
+class _BrokenLLM:
+    async def abatch(self, prompts, **kwargs):
+        raise RuntimeError("backend down")
+
+
+def test_writes_every_sample_in_order(tmp_path):
+    output = tmp_path / "queries.jsonl"
+    llm = FakeQueryLLM(latency=0.001, jitter=0.005)
+    stats = asyncio.run(agenerate_user_queries(
+        _index(), PARAGRAPHS, llm, str(output), 20, batch_size=3, dedup_threshold=None,
+    ))
+
+    samples = [int(json.loads(line)["id"].split("-")[0]) for line in output.open()]
+    assert stats["prompts"] == 20
+    assert samples == sorted(samples)
+    assert sorted(set(samples)) == list(range(20))
+
+
+def test_llm_error_is_raised_instead_of_hanging(tmp_path):
+    run = agenerate_user_queries(
+        _index(), PARAGRAPHS, _BrokenLLM(), str(tmp_path / "queries.jsonl"), 20, batch_size=3,
+    )
+    with pytest.raises(RuntimeError, match="backend down"):
+        asyncio.run(asyncio.wait_for(run, timeout=10))
+
+
+def test_writer_refuses_a_file_it_did_not_create(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text("old content\n")
+    with pytest.raises(FileExistsError):
+        CheckpointedJsonlWriter(str(path))
+    assert path.read_text() == "old content\n"
+
+    with CheckpointedJsonlWriter(str(path), overwrite=True) as writer:
+        writer.write([{"id": 0}], 1)
+    assert path.read_text() == '{"id": 0}\n'
+
+
+def test_writer_resumes_from_the_last_checkpoint(tmp_path):
+    path = str(tmp_path / "queries.jsonl")
+    writer = CheckpointedJsonlWriter(path, checkpoint_every=2)
+    writer.write([{"id": 0}, {"id": 1}], 2)  # checkpointed
+    writer.write([{"id": 2}], 3)
+    writer._file.close()  # on disk but after the checkpoint, as when killed here
+    assert os.path.getsize(path) > json.load(open(f"{path}.ckpt"))["bytes"]
+
+    resumed = CheckpointedJsonlWriter(path, checkpoint_every=2)
+    assert (resumed.next_sample, resumed.records) == (2, 2)
+    resumed.write([{"id": 2}, {"id": 3}], 4)
+    resumed.close()
+    with open(path) as f:
+        assert [json.loads(line)["id"] for line in f] == [0, 1, 2, 3]
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+from benchmarks.fake_llm import FakeGraphLLM
+from generation.scheduler import ExtractionScheduler, run_pipeline
+from text_preprocessing.chunking import Chunk
+
+TEXTS = [f"Chunk {i} about students, grading and the LMS." for i in range(12)]
+
+
+def _transformer(**options):
+    return LLMGraphTransformer(llm=FakeGraphLLM(**options))
+
+
+class _Counting:
+    # tracks how many conversions run at the same time
+    def __init__(self, inner):
+        self.inner = inner
+        self.active = 0
+        self.peak = 0
+
+    async def aconvert_to_graph_documents(self, docs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await self.inner.aconvert_to_graph_documents(docs)
+        finally:
+            self.active -= 1
+
+
+def test_run_returns_documents_in_input_order():
+    # jitter makes calls finish out of order
+    scheduler = ExtractionScheduler(_transformer(latency=0.001, jitter=0.02, seed=3), max_in_flight=4)
+    docs = asyncio.run(scheduler.run(TEXTS))
+    assert [d.source.page_content for d in docs] == TEXTS
+    assert scheduler.stats["completed"] == len(TEXTS)
+
+
+def test_in_flight_limit():
+    transformer = _Counting(_transformer(latency=0.02))
+    asyncio.run(ExtractionScheduler(transformer, max_in_flight=3).run(TEXTS))
+    assert transformer.peak == 3
+
+
+def test_failures_are_retried():
+    scheduler = ExtractionScheduler(
+        _transformer(latency=0.001, failure_rate=0.3, seed=1), retries=10, backoff=0.001
+    )
+    docs = asyncio.run(scheduler.run(TEXTS))
+    assert len(docs) == len(TEXTS)
+    assert scheduler.stats["retried"] > 0
+    assert scheduler.failed == []
+
+
+def test_exhausted_retries_are_recorded_not_raised():
+    scheduler = ExtractionScheduler(
+        _transformer(latency=0.001, failure_rate=1.0), retries=1, backoff=0.001
+    )
+    assert asyncio.run(scheduler.run(TEXTS)) == []
+    assert sorted(i for i, _, _ in scheduler.failed) == list(range(len(TEXTS)))
+    assert scheduler.stats["failed"] == len(TEXTS)
+    assert scheduler.stats["retried"] == len(TEXTS)
+
+
+def test_timeout_counts_as_failure():
+    scheduler = ExtractionScheduler(
+        _transformer(latency=1.0), timeout=0.02, retries=1, backoff=0.001
+    )
+    start = time.perf_counter()
+    assert asyncio.run(scheduler.run(TEXTS[:2])) == []
+    assert time.perf_counter() - start < 1.0
+    assert all(isinstance(exc, asyncio.TimeoutError) for _, _, exc in scheduler.failed)
+
+
+def test_chunk_provenance_reaches_source_metadata():
+    chunks = [Chunk(text, 10, [i], [i + 1]) for i, text in enumerate(TEXTS[:3])]
+    docs = asyncio.run(ExtractionScheduler(_transformer(latency=0.001)).run(chunks))
+    assert [d.source.metadata for d in docs] == [c.metadata for c in chunks]
+
+
+def test_cache_error_is_raised_instead_of_hanging():
+    class BrokenCache:
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            raise OSError("disk full")
+
+    scheduler = ExtractionScheduler(
+        _transformer(latency=0.001), cache=BrokenCache(), cache_key=lambda text: text
+    )
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(asyncio.wait_for(scheduler.run(TEXTS), timeout=10))
+
+
+def test_cache_hit_keeps_the_chunks_own_provenance():
+    class DictCache(dict):
+        def set(self, key, value):
+            self[key] = value
+
+    text = TEXTS[0]
+    first, second = Chunk(text, 10, [0], [1]), Chunk(text, 10, [5], [9])
+    cache = DictCache()
+    transformer = _transformer(latency=0.001)
+    asyncio.run(ExtractionScheduler(transformer, cache=cache, cache_key=lambda t: t).run([first]))
+    scheduler = ExtractionScheduler(transformer, cache=cache, cache_key=lambda t: t)
+    [doc] = asyncio.run(scheduler.run([second]))
+    assert scheduler.stats["cached"] == 1
+    assert doc.source.metadata == second.metadata
+    assert cache[text].source.metadata == first.metadata
+
+
+def test_run_pipeline_passes_results_through_and_raises_feed_errors():
+    async def feed(submit, emit):
+        await emit("ready")
+        for i in range(5):
+            await submit([i, i])
+        raise ValueError("bad input")
+
+    async def work(batch):
+        await asyncio.sleep(0)
+        for item in batch:
+            yield item * 10
+
+    async def collect():
+        return [item async for item in run_pipeline(feed, work, 2, inbox_size=1)]
+
+    async def stop_early():
+        results = run_pipeline(feed, work, 2, inbox_size=1)
+        first = await results.__anext__()
+        await results.aclose()
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return first, pending
+
+    with pytest.raises(ValueError, match="bad input"):
+        asyncio.run(collect())
+    assert asyncio.run(stop_early()) == ("ready", [])
@@ -0,0 +1,104 @@
+from collections import Counter
+
+import fitz
+import pytest
+
+from benchmarks.fixtures import make_pdf
+from text_preprocessing import text_preprocessing as tp
+
+
+def _reference_paragraphs(pdf_path, min_length=300, size_tolerance=0.5):
+    # the original two-pass extraction, kept as the definition of correct output
+    doc = fitz.open(pdf_path)
+    all_sizes = []
+    for page in doc:
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    all_sizes.append(round(span["size"], 1))
+    if not all_sizes:
+        return []
+    body_size = Counter(all_sizes).most_common(1)[0][0]
+
+    paragraphs = []
+    for page in doc:
+        for block in page.get_text("dict")["blocks"]:
+            spans = []
+            text = ""
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    spans.append(round(span["size"], 1))
+                    text += span["text"]
+                text += "\n"
+            if not spans:
+                continue
+            if abs(sum(spans) / len(spans) - body_size) > size_tolerance:
+                continue
+            for para in text.split("\n\n"):
+                p = para.strip()
+                if len(p) >= min_length and not p.isupper():
+                    paragraphs.append(p)
+    return paragraphs
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "report.pdf")
+    make_pdf(path, pages=30, seed=7)
+    # a page with the cases the filters exist for: shouting, short and blank-line split blocks
+    with fitz.open(path) as doc:
+        page = doc.new_page()
+        body = "Body text that is long enough to count as a paragraph of the report. " * 6
+        page.insert_textbox(fitz.Rect(50, 40, 550, 200), body.upper(), fontsize=10)
+        page.insert_textbox(fitz.Rect(50, 210, 550, 240), "Too short.", fontsize=10)
+        page.insert_textbox(fitz.Rect(50, 250, 550, 700), f"{body}\n\n{body}", fontsize=10)
+        doc.saveIncr()
+    return path
+
+
+def test_serial_extraction_matches_reference(pdf):
+    assert tp.extract_paragraphs(pdf, workers=1) == _reference_paragraphs(pdf)
+
+
+def test_parallel_extraction_matches_reference(pdf, monkeypatch):
+    monkeypatch.setattr(tp, "PARALLEL_MIN_PAGES", 1)
+    monkeypatch.setattr(tp, "PAGES_PER_TASK", 7)
+    assert tp.extract_paragraphs(pdf, workers=2) == _reference_paragraphs(pdf)
+
+
+def test_pages_are_one_based(pdf):
+    records = list(tp.iter_paragraphs(pdf, with_pages=True))
+    assert [p for _, p in records] == _reference_paragraphs(pdf)
+    assert records[0][0] == 1
+    assert records[-1][0] == 31
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    from benchmarks.fixtures import tiny_pegasus
+
+    return tiny_pegasus(str(tmp_path_factory.mktemp("model")))
+
+
+def test_failing_paragraph_does_not_lose_its_batch(tiny_model, monkeypatch):
+    from benchmarks.fixtures import synthetic_paragraphs
+
+    tokenizer, model = tiny_model
+    texts = synthetic_paragraphs(5, seed=1, duplicate_rate=0)
+    texts.insert(2, " ".join(texts) * 3)
+    expected = tp.summarize_batch(texts[:2] + texts[3:], tokenizer, model)
+
+    generate = model.generate
+
+    def flaky_generate(input_ids, **kwargs):
+        if input_ids.shape[1] > 400:
+            raise RuntimeError("out of memory")
+        return generate(input_ids=input_ids, **kwargs)
+
+    monkeypatch.setattr(model, "generate", flaky_generate)
+    summaries = tp.summarize_batch(texts, tokenizer, model, batch_size=8)
+    assert summaries[2] is None
+    assert summaries[:2] + summaries[3:] == expected
+
+    monkeypatch.undo()
+    assert isinstance(tp.reduce_summaries(summaries, tokenizer, model), str)
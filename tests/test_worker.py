@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.fixtures import make_pdf, synthetic_paragraphs, tiny_pegasus
+from pipeline import cli
+from pipeline.worker import Worker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "report.pdf")
+    make_pdf(path, pages=3, seed=2)
+    return path
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("model"))
+    tokenizer, model = tiny_pegasus(path)
+    tokenizer.save_pretrained(path)
+    model.save_pretrained(path)
+    return path
+
+
+def _serve(worker, *lines):
+    out = io.StringIO()
+    worker.serve_stream(io.StringIO("".join(f"{line}\n" for line in lines)), out)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_handle_replies_for_every_request(pdf):
+    worker = Worker()
+    assert worker.handle({"id": 1, "op": "ping"}) == {
+        "id": 1, "ok": True, "result": {"jobs": 0, "model": None},
+    }
+    assert worker.handle({"id": 2, "op": "nope"})["error"] == "unknown op 'nope'"
+    assert worker.handle([1]) == {
+        "id": None, "ok": False, "error": "bad request: expected a JSON object",
+    }
+
+    reply = worker.handle({"id": 3, "op": "paragraphs", "pdf": pdf})
+    assert reply["ok"] and reply["result"]
+    missing = worker.handle({"id": 4, "op": "paragraphs", "pdf": pdf + ".missing"})
+    assert not missing["ok"] and missing["id"] == 4
+    assert worker.jobs == 2  # ping and paragraphs; failed jobs are not counted
+
+
+def test_summarize_keeps_the_model_loaded(model_dir):
+    worker = Worker(model_name=model_dir, batch_size=2)
+    texts = synthetic_paragraphs(3, seed=4, duplicate_rate=0)
+    first = worker.handle({"op": "summarize", "texts": texts})
+    second = worker.handle({"op": "summarize", "texts": texts, "reduce": True})
+    assert first["ok"] and len(first["result"]) == 3
+    assert second["result"]["summaries"] == first["result"]
+    assert isinstance(second["result"]["overall"], str)
+    assert worker.summarizer() is worker.summarizer()
+
+
+def test_serve_stream_survives_bad_lines():
+    replies = _serve(
+        Worker(), '{"id": 1, "op": "ping"}', "not json", "[1]", "", '"text"',
+        '{"id": 2, "op": "shutdown"}', '{"id": 3, "op": "ping"}',
+    )
+    assert [r["id"] for r in replies] == [1, None, None, None, 2]
+    assert [r["ok"] for r in replies] == [True, False, False, False, True]
+    assert replies[1]["error"].startswith("bad request:")
+
+
+def test_cli_worker_over_stdio(pdf):
+    requests = [{"id": 1, "op": "ping"}, [1], {"id": 2, "op": "paragraphs", "pdf": pdf},
+                {"id": 3, "op": "shutdown"}]
+    proc = subprocess.run(
+        [sys.executable, "-m", "pipeline", "worker", "--lazy"],
+        input="".join(json.dumps(r) + "\n" for r in requests),
+        capture_output=True, text=True, cwd=ROOT, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    replies = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert [(r["id"], r["ok"]) for r in replies] == [(1, True), (None, False), (2, True), (3, True)]
+
+
+def test_cli_summarize(pdf, model_dir, tmp_path, capsys):
+    out = tmp_path / "summaries.json"
+    assert cli.main(["summarize", pdf, "--model", model_dir, "--out", str(out)]) == 0
+    assert all(isinstance(s, str) for s in json.loads(out.read_text()))
+
+    assert cli.main(["summarize", pdf + ".missing", "--model", model_dir]) == 1
+    assert "Error:" in capsys.readouterr().err
+
+
+def test_cli_paragraphs(pdf, capsys):
+    cli.main(["paragraphs", pdf])
+    printed = [p for p in capsys.readouterr().out.split("\n\n") if p.strip()]
+    assert printed
@@ -0,0 +1,128 @@
+import re
+from dataclasses import dataclass, field
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def approx_token_count(text: str) -> int:
+    # ~4 characters per token for English under Llama/SentencePiece-style vocabularies
+    return max(1, (len(text) + 3) // 4)
+
+
+def hf_token_counter(tokenizer):
+    """Exact token counts from a Hugging Face tokenizer."""
+    def count(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return count
+
+
+@dataclass
+class Chunk:
+    text: str
+    tokens: int
+    paragraphs: list = field(default_factory=list)  # paragraph indices, in order
+    pages: list = field(default_factory=list)  # sorted page numbers
+
+    @property
+    def metadata(self) -> dict:
+        return {"paragraphs": self.paragraphs, "pages": self.pages}
+
+
+@dataclass
+class _Unit:
+    text: str
+    tokens: int
+    paragraph: int
+    page: int | None
+
+
+def _split_words(sentence, max_tokens, count_tokens):
+    for word in sentence.split():
+        n = count_tokens(word)
+        if n <= max_tokens:
+            yield word
+            continue
+        # a single "word" over budget (tables, URLs, base64): cut it by characters
+        step = max(1, len(word) * max_tokens // n)
+        for start in range(0, len(word), step):
+            yield word[start:start + step]
+
+
+def _split_oversized(text, max_tokens, count_tokens):
+    # sentence-sized pieces first, then word windows for run-on sentences
+    piece, used = [], 0
+    for sentence in _SENTENCE_END.split(text):
+        n = count_tokens(sentence)
+        if n > max_tokens:
+            if piece:
+                yield " ".join(piece)
+                piece, used = [], 0
+            window = []
+            for word in _split_words(sentence, max_tokens, count_tokens):
+                window.append(word)
+                if count_tokens(" ".join(window)) > max_tokens and len(window) > 1:
+                    yield " ".join(window[:-1])
+                    window = [word]
+            if window:
+                yield " ".join(window)
+            continue
+        if piece and used + n + 1 > max_tokens:
+            yield " ".join(piece)
+            piece, used = [], 0
+        piece.append(sentence)
+        used += n + 1
+    if piece:
+        yield " ".join(piece)
+
+
+def _units(paragraphs, max_tokens, count_tokens):
+    for i, item in enumerate(paragraphs):
+        page, text = item if isinstance(item, tuple) else (None, item)
+        n = count_tokens(text)
+        if n <= max_tokens:
+            yield _Unit(text, n, i, page)
+            continue
+        for piece in _split_oversized(text, max_tokens, count_tokens):
+            yield _Unit(piece, count_tokens(piece), i, page)
+
+
+def _make_chunk(units, separator):
+    pages = sorted({u.page for u in units if u.page is not None})
+    paragraphs = list(dict.fromkeys(u.paragraph for u in units))
+    text = separator.join(u.text for u in units)
+    return Chunk(text, sum(u.tokens for u in units) + len(units) - 1, paragraphs, pages)
+
+
+def pack_chunks(paragraphs, max_tokens=1024, overlap_tokens=0,
+                count_tokens=approx_token_count, separator="\n\n"):
+    """Pack consecutive paragraphs into chunks of at most ``max_tokens`` tokens.
+
+    ``paragraphs`` are strings or ``(page, text)`` pairs, as produced by
+    ``iter_paragraphs(..., with_pages=True)``. Paragraphs larger than the
+    budget are split on sentence (then word) boundaries rather than left for
+    the model to truncate. With ``overlap_tokens``, each chunk starts with
+    the trailing paragraphs of the previous one, up to that many tokens.
+    Every chunk records the paragraph indices and pages it came from.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    current, used, fresh = [], 0, 0
+    for unit in _units(paragraphs, max_tokens, count_tokens):
+        if fresh and used + unit.tokens + 1 > max_tokens:
+            yield _make_chunk(current, separator)
+            # carry the tail of this chunk over, as long as the next unit still fits
+            tail, kept = [], 0
+            for prev in reversed(current):
+                if kept + prev.tokens + 1 > overlap_tokens:
+                    break
+                tail.insert(0, prev)
+                kept += prev.tokens + 1
+            while tail and kept + unit.tokens + 1 > max_tokens:
+                kept -= tail.pop(0).tokens + 1
+            current, used, fresh = tail, kept, 0
+        current.append(unit)
+        used += unit.tokens + 1
+        fresh += 1
+    if fresh:
+        yield _make_chunk(current, separator)
@@ -0,0 +1,152 @@
+import numpy as np
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+# shingles hashed per permutation pass; bounds the (num_perm, shingles) work matrix
+_SHINGLES_PER_PASS = 1 << 16
+
+
+def _lsh_shape(threshold: float, num_perm: int):
+    # (bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to the threshold
+    shapes = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(shapes, key=lambda s: abs((1 / s[0]) ** (1 / s[1]) - threshold))
+
+
+def _shingle_hashes(text: str, k: int):
+    data = np.frombuffer(" ".join(text.casefold().split()).encode("utf-8"), dtype=np.uint8)
+    if data.size < k:
+        data = np.concatenate([data, np.zeros(k - data.size, dtype=np.uint8)])
+    windows = np.lib.stride_tricks.sliding_window_view(data, k).astype(np.uint64)
+    powers = _SHINGLE_BASE ** np.arange(k, dtype=np.uint64)
+    return np.unique(windows @ powers)
+
+
+def _grow(array, rows):
+    grown = np.empty((rows, *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class NearDuplicateFilter:
+    """Streaming MinHash/LSH filter for near-duplicate texts.
+
+    Texts are reduced to ``num_perm`` MinHash values over character
+    ``shingle_size``-grams and split into LSH bands sized for ``threshold``.
+    A text is a duplicate when it shares a band with an earlier kept text
+    whose estimated Jaccard similarity is at least ``threshold``. Each check
+    only looks at the texts in its own buckets, so a run is sub-quadratic.
+    A kept text costs ``4 * num_perm`` bytes of signature plus one bucket
+    entry per band, about 1 KB with the defaults, so an unbounded filter
+    grows by roughly 1 GB per million kept texts. With ``capacity`` only the
+    most recently kept texts are remembered: the oldest one is forgotten
+    for each new one beyond that, and memory stays flat.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, shingle_size=5, seed=1, capacity=None):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.capacity = capacity
+        self.bands, self.rows = _lsh_shape(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: high 32 bits of (a * x + b) mod 2**64
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64)[:, None] | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)[:, None]
+        self._band_mix = rng.integers(1, 2 ** 63, (self.bands, self.rows), dtype=np.uint64)
+
+        # every band has its own mixing row, so band keys can share one dict
+        self._buckets = {}  # band key -> slots of kept texts
+        size = min(1024, capacity) if capacity else 1024
+        self._signatures = np.empty((size, num_perm), dtype=np.uint32)
+        # band keys per slot, so a forgotten text can be taken out of its buckets
+        self._slot_keys = np.empty((size, self.bands), dtype=np.uint64) if capacity else None
+        self.kept = 0
+        self.duplicates = 0
+
+    def signatures(self, texts) -> np.ndarray:
+        """``(len(texts), num_perm)`` MinHash signatures."""
+        hashes = [_shingle_hashes(t, self.shingle_size) for t in texts]
+        out = np.empty((len(hashes), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(hashes):
+            # as many texts as fit in one pass, always at least one
+            stop, total = start, 0
+            while stop < len(hashes) and (stop == start or total + hashes[stop].size <= _SHINGLES_PER_PASS):
+                total += hashes[stop].size
+                stop += 1
+            flat = np.concatenate(hashes[start:stop])
+            permuted = ((self._a * flat + self._b) >> np.uint64(32)) & _MASK32
+            bounds = np.cumsum([0] + [h.size for h in hashes[start:stop - 1]])
+            out[start:stop] = np.minimum.reduceat(permuted, bounds, axis=1).T
+            start = stop
+        return out
+
+    def _band_keys(self, signature):
+        bands = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=1).tolist()
+
+    def _check(self, signature) -> bool:
+        keys = self._band_keys(signature)
+        candidates = {i for k in keys for i in self._buckets.get(k, ())}
+        if candidates:
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[ids] == signature).mean(axis=1)
+            if similarity.max() >= self.threshold:
+                self.duplicates += 1
+                return True
+        slot = self.kept % self.capacity if self.capacity else self.kept
+        if self.capacity and self.kept >= self.capacity:
+            self._forget(slot)
+        elif slot == len(self._signatures):
+            size = min(2 * slot, self.capacity) if self.capacity else 2 * slot
+            self._signatures = _grow(self._signatures, size)
+            if self._slot_keys is not None:
+                self._slot_keys = _grow(self._slot_keys, size)
+        self._signatures[slot] = signature
+        if self._slot_keys is not None:
+            self._slot_keys[slot] = keys
+        for k in keys:
+            self._buckets.setdefault(k, []).append(slot)
+        self.kept += 1
+        return False
+
+    def _forget(self, slot):
+        for k in self._slot_keys[slot].tolist():
+            bucket = self._buckets[k]
+            bucket.remove(slot)
+            if not bucket:
+                del self._buckets[k]
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if ``text`` nearly duplicates a kept text; otherwise keep it."""
+        return self._check(self.signatures([text])[0])
+
+    def add(self, text: str):
+        """Remember ``text`` as already seen without counting it."""
+        duplicates = self.duplicates
+        self._check(self.signatures([text])[0])
+        self.duplicates = duplicates
+
+    def filter(self, items, batch_size=256, key=None):
+        """Yield the items that are not near-duplicates of an earlier one.
+
+        ``key`` picks the text out of each item, e.g. for ``(page, text)`` pairs.
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield from self._filter_batch(batch, key)
+                batch = []
+        if batch:
+            yield from self._filter_batch(batch, key)
+
+    def _filter_batch(self, batch, key):
+        texts = batch if key is None else [key(item) for item in batch]
+        for item, signature in zip(batch, self.signatures(texts)):
+            if not self._check(signature):
+                yield item
+
+    def stats(self) -> dict:
+        return {"kept": self.kept, "duplicates": self.duplicates}
@@ -1,91 +1,324 @@
-from transformers import PegasusTokenizer, PegasusForConditionalGeneration
 import torch
 import fitz
+import os
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
+from pipeline import instrumentation
+from pipeline.cache import ResultCache
+from text_preprocessing.dedup import NearDuplicateFilter
 
 
-def summarize(text: str, tokenizer, model):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True)
-    summary_ids = model.generate(
-        inputs["input_ids"],
-        num_beams=4,
-        max_length=128,
-        min_length=50,
-        no_repeat_ngram_size=2,
+MODEL_NAME = "google/pegasus-cnn_dailymail"
+DEFAULT_PDF = "../Data/First Project Assignment - Research based design report.pdf"
+
+GENERATION_KWARGS = dict(
+    num_beams=4,
+    max_length=128,
+    min_length=50,
+    no_repeat_ngram_size=2,
+)
+
+
+@lru_cache(maxsize=None)
+def load_summarizer(model_name: str = MODEL_NAME, device: str = "cpu"):
+    """Load the Pegasus tokenizer and model once per process; later calls reuse them."""
+    from transformers import PegasusForConditionalGeneration, PegasusTokenizer
+
+    tokenizer = PegasusTokenizer.from_pretrained(model_name)
+    model = PegasusForConditionalGeneration.from_pretrained(model_name).to(torch.device(device))
+    return tokenizer, model.eval()
+
+
+def summarize(text: str, tokenizer, model, cache=None):
+    return summarize_batch([text], tokenizer, model, cache=cache)[0]
+
+
+def _cache_key(text: str, model, **params):
+    return ResultCache.make_key(
+        text, model.name_or_path, **GENERATION_KWARGS, **params
     )
-    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-    return summary
 
 
-def extract_paragraphs(pdf_path, min_length=300, size_tolerance=0.5):
-    doc = fitz.open(pdf_path)
+@instrumentation.timed("summarize")
+def summarize_batch(texts, tokenizer, model, batch_size=8, num_threads=None, cache=None):
+    """Summarize texts in padded batches of similar token length.
 
-    all_sizes = []
-    for page in doc:
-        for block in page.get_text("dict")["blocks"]:
-            for line in block.get("lines", []):
-                for span in line["spans"]:
-                    all_sizes.append(round(span["size"], 1))
-    if not all_sizes:
+    Texts are sorted by token count so each batch pads as little as possible,
+    and every batch is a single ``model.generate`` call. Summaries come back in
+    the same order as ``texts``. With a ``ResultCache`` only texts that were
+    never summarized with this model and these settings reach the model.
+    A batch that fails is retried text by text; texts that still fail are
+    logged and left as ``None``, and the rest keep their summaries.
+    """
+    texts = list(texts)
+    if not texts:
         return []
+    if num_threads:
+        torch.set_num_threads(num_threads)
 
-    body_size = Counter(all_sizes).most_common(1)[0][0]
-
-    paragraphs = []
-    for page in doc:
-        for block in page.get_text("dict")["blocks"]:
-            spans = []
-            text = ""
-            for line in block.get("lines", []):
-                for span in line["spans"]:
-                    spans.append(round(span["size"], 1))
-                    text += span["text"]
-                text += "\n"
-            if not spans:
-                continue
+    summaries = [None] * len(texts)
+    keys = [None] * len(texts)
+    pending = list(range(len(texts)))
+    if cache is not None:
+        keys = [_cache_key(text, model) for text in texts]
+        for i, key in enumerate(keys):
+            summaries[i] = cache.get(key)
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        instrumentation.count("summarize_cache_hits", len(texts) - len(pending))
+    instrumentation.count("summarize_texts", len(texts))
+    if not pending:
+        return summaries
+
+    encoded = tokenizer([texts[i] for i in pending], truncation=True)["input_ids"]
+    generated = _generate_batched(encoded, tokenizer, model, batch_size, isolate_errors=True)
+    for i, ids in zip(pending, generated):
+        if ids is None:
+            continue
+        summaries[i] = tokenizer.decode(ids, skip_special_tokens=True)
+        if cache is not None:
+            cache.set(keys[i], summaries[i])
+
+    return summaries
+
+
+def _generate(encoded, tokenizer, model):
+    batch = tokenizer.pad({"input_ids": encoded}, return_tensors="pt")
+    with instrumentation.span("summarize.generate"):
+        summary_ids = model.generate(
+            input_ids=batch["input_ids"].to(model.device),
+            attention_mask=batch["attention_mask"].to(model.device),
+            **GENERATION_KWARGS,
+        )
+    if instrumentation.enabled():
+        instrumentation.count("summarize_input_tokens", int(batch["attention_mask"].sum()))
+        instrumentation.count(
+            "summarize_output_tokens",
+            int((summary_ids != tokenizer.pad_token_id).sum()),
+        )
+    return summary_ids.tolist()
+
+
+def _generate_batched(encoded, tokenizer, model, batch_size, isolate_errors=False):
+    # shortest inputs first so each padded batch wastes as little as possible
+    order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+    outputs = [None] * len(encoded)
+
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            try:
+                generated = _generate([encoded[i] for i in idx], tokenizer, model)
+            except Exception:
+                if not isolate_errors:
+                    raise
+                # one bad input must not cost its batch-mates their summaries
+                generated = []
+                for i in idx:
+                    try:
+                        generated.extend(_generate([encoded[i]], tokenizer, model))
+                    except Exception as exc:
+                        print(f"Error summarizing paragraph (len={len(encoded[i])} tokens): {exc}")
+                        instrumentation.count("summarize_failed")
+                        generated.append(None)
+            for i, ids in zip(idx, generated):
+                outputs[i] = ids
+
+    return outputs
+
+
+def _group_by_budget(items, budget):
+    # consecutive runs of token lists whose total length fits the budget;
+    # every group but the last holds at least two items so each level shrinks
+    groups = []
+    current, used = [], 0
+    for ids in items:
+        if len(current) > 1 and used + len(ids) > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(ids)
+        used += len(ids)
+    if current:
+        groups.append(current)
+    return groups
+
+
+@instrumentation.timed("reduce_summaries")
+def reduce_summaries(summaries, tokenizer, model, max_tokens=None, batch_size=8, cache=None):
+    """Combine many summaries into one by summarizing them level by level.
+
+    Each level packs consecutive summaries into groups that fit the model's
+    input window and summarizes every group in one batched pass, until a
+    single summary is left. Cost grows with the number of summaries rather
+    than with document length, and no part of the document is truncated away.
+    Summaries are tokenized once; higher levels feed the generated token ids
+    straight back in without decoding and re-encoding them.
+    """
+    # paragraphs whose summary failed come through as None
+    summaries = [s for s in summaries if s is not None]
+    if len(summaries) <= 1:
+        return summaries[0] if summaries else ""
+
+    max_tokens = max_tokens or tokenizer.model_max_length
+    if cache is not None:
+        key = _cache_key("\n".join(summaries), model, reduce_max_tokens=max_tokens)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-            avg_size = sum(spans) / len(spans)
+    eos = tokenizer.eos_token_id
+    special = set(tokenizer.all_special_ids)
+
+    level = tokenizer(summaries, add_special_tokens=False)["input_ids"]
+    while len(level) > 1:
+        inputs = [
+            [t for ids in group for t in ids][:max_tokens - 1] + [eos]
+            for group in _group_by_budget(level, max_tokens - 1)
+        ]
+        level = [
+            [t for t in ids if t not in special]
+            for ids in _generate_batched(inputs, tokenizer, model, batch_size)
+        ]
+
+    overall = tokenizer.decode(level[0], skip_special_tokens=True)
+    if cache is not None:
+        cache.set(key, overall)
+    return overall
+
+
+# documents with at least this many pages are parsed in a process pool
+PARALLEL_MIN_PAGES = 200
+PAGES_PER_TASK = 50
+
+# image blocks never contribute text, so don't ask MuPDF to decode them
+_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+
+def _parse_pages(pdf_path, start: int, stop: int, min_length: int):
+    """Parse pages [start, stop) once.
+
+    Returns the span size histogram of those pages and, per page, a compact
+    list of (avg_size, candidate_paragraphs) for every text block that has
+    at least one paragraph passing the length/uppercase filter.
+    """
+    sizes = Counter()
+    pages = []
+    with fitz.open(pdf_path) as doc:
+        for pno in range(start, stop):
+            blocks = []
+            for block in doc[pno].get_text("dict", flags=_DICT_FLAGS)["blocks"]:
+                spans = []
+                text = ""
+                for line in block.get("lines", []):
+                    for span in line["spans"]:
+                        spans.append(round(span["size"], 1))
+                        text += span["text"]
+                    text += "\n"
+                if not spans:
+                    continue
+                sizes.update(spans)
+
+                candidates = []
+                for para in text.split("\n\n"):
+                    p = para.strip()
+                    if len(p) >= min_length and not p.isupper():
+                        candidates.append(p)
+                if candidates:
+                    blocks.append((sum(spans) / len(spans), candidates))
+            pages.append(blocks)
+    return sizes, pages
+
+
+def _parse_document(pdf_path, min_length: int, workers=None):
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    if workers == 1 or page_count < PARALLEL_MIN_PAGES:
+        return _parse_pages(pdf_path, 0, page_count, min_length)
+
+    ranges = [
+        (start, min(start + PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    sizes = Counter()
+    pages = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _parse_pages,
+            [pdf_path] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+            [min_length] * len(ranges),
+        )
+        # merge in page order so most_common() breaks ties like a serial pass
+        for part_sizes, part_pages in results:
+            sizes.update(part_sizes)
+            pages.extend(part_pages)
+    return sizes, pages
+
+
+def _body_paragraphs(pdf_path, min_length, size_tolerance, workers):
+    with instrumentation.span("extract_paragraphs"):
+        sizes, pages = _parse_document(pdf_path, min_length, workers)
+    if instrumentation.enabled():
+        instrumentation.count("pdf_pages", len(pages))
+        instrumentation.count("pdf_bytes", os.path.getsize(pdf_path))
+    if not sizes:
+        return
+
+    body_size = sizes.most_common(1)[0][0]
+
+    for page_no, blocks in enumerate(pages, start=1):
+        for avg_size, candidates in blocks:
             if abs(avg_size - body_size) > size_tolerance:
                 continue
+            for p in candidates:
+                instrumentation.count("paragraphs")
+                yield page_no, p
 
-            for para in text.split("\n\n"):
-                p = para.strip()
-                if len(p) >= min_length and not p.isupper():
-                    paragraphs.append(p)
 
-    return paragraphs
+def iter_paragraphs(pdf_path, min_length=300, size_tolerance=0.5, workers=None, dedup=None,
+                    with_pages=False):
+    """Yield body-text paragraphs of a PDF, parsing every page only once.
 
-def get_paragraphs():
-    paragraphs = extract_paragraphs("../Data/First Project Assignment - Research based design report.pdf")
+    With a ``NearDuplicateFilter`` as ``dedup``, paragraphs that nearly repeat
+    an earlier one are dropped before they reach summarization or graph
+    extraction. ``with_pages`` yields ``(page_number, paragraph)`` pairs
+    instead, with 1-based page numbers.
+    """
+    paragraphs = _body_paragraphs(pdf_path, min_length, size_tolerance, workers)
+    if dedup is not None:
+        paragraphs = dedup.filter(paragraphs, key=lambda item: item[1])
+    if with_pages:
+        return paragraphs
+    return (p for _, p in paragraphs)
 
-    device = torch.device("cpu")
-    model_name = "google/pegasus-cnn_dailymail"
-    tokenizer = PegasusTokenizer.from_pretrained(model_name)
-    model = PegasusForConditionalGeneration.from_pretrained(model_name).to(device)
-
-    summaries = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_para = {
-            executor.submit(summarize, para, tokenizer, model): para
-            for para in paragraphs
-        }
-        for future in as_completed(future_to_para):
-            try:
-                summ = future.result()
-                summaries.append(summ)
-            except Exception as exc:
-                para = future_to_para[future]
-                print(f"Error summarizing paragraph (len={len(para)}): {exc}")
-
-    all_text = " ".join(paragraphs)
-    overall_summ = summarize(all_text, tokenizer, model)
+
+def extract_paragraphs(pdf_path, min_length=300, size_tolerance=0.5, workers=None, dedup=None):
+    return list(iter_paragraphs(pdf_path, min_length, size_tolerance, workers, dedup))
+
+def get_paragraphs(cache=None, dedup_threshold=0.8, pdf_path=DEFAULT_PDF, tokenizer=None, model=None):
+    dedup = NearDuplicateFilter(dedup_threshold) if dedup_threshold else None
+    paragraphs = extract_paragraphs(pdf_path, dedup=dedup)
+    if dedup is not None:
+        print(f"Skipped {dedup.duplicates} near-duplicate paragraphs")
+
+    if tokenizer is None or model is None:
+        tokenizer, model = load_summarizer()
+
+    # one summary per paragraph, in paragraph order; failed ones were logged and are skipped
+    summaries = [
+        s for s in summarize_batch(paragraphs, tokenizer, model, cache=cache) if s is not None
+    ]
+
+    overall_summ = reduce_summaries(summaries, tokenizer, model, cache=cache)
     summaries.append(overall_summ)
 
     return summaries
 
-# get_paragraphs()
-paragraphs = extract_paragraphs("../Data/First Project Assignment - Research based design report.pdf")
-for para in paragraphs:
-    print(f"{para}\n")
\ No newline at end of file
+
+if __name__ == "__main__":
+    # get_paragraphs()
+    for para in iter_paragraphs(DEFAULT_PDF):
+        print(f"{para}\n")